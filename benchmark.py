@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import datetime
+import tempfile
+import tracemalloc
+import subprocess
+
+import numpy as np
+
+import gen.toolboxes as t
+from experiment import Experiment
+from simulation import space
+from simulation.boids import SheepAgent, VIEW_RANGE
+from simulation.environment import Environment
+
+
+QUERIES = 1000
+
+def seed_all(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+
+def counts(size):
+    wolves = max(1, size // 5)
+    return size - wolves, wolves
+
+def toolbox(size):
+    sheep, wolves = counts(size)
+    return t.environment(t.darwinian(t.sheep(count=sheep)), t.lamarckian(t.wolves(count=wolves)))
+
+def filled_space(size, index='grid'):
+    cached = space.CachedSpace(index)
+    for _ in range(size):
+        cached.place_agent(SheepAgent(np.zeros(7), cached), np.random.rand(2))
+    cached._update()
+    return cached
+
+def model(size, options):
+    species, = toolbox(size).population()
+    return Environment(options.steps, engine=options.engine, index=options.index).prepare_model(species, 0)
+
+# Every benchmark gets a fresh setup() result and returns the number of
+# operations done by run(), used to report throughput. A benchmark may add
+# a teardown() releasing the setup() result once it has been timed.
+def space_update(size, options):
+    def setup():
+        cached = filled_space(size, options.index)
+        cached._outdated = True
+        return cached
+    return setup, lambda cached: cached._update() or 1
+
+def get_neighbors(size, options):
+    def run(cached):
+        for i in range(QUERIES):
+            list(cached.get_neighbors(cached.agents[i % size], VIEW_RANGE))
+        return QUERIES
+    return lambda: filled_space(size, options.index), run
+
+def get_distance(size, options):
+    def run(pos):
+        for i in range(QUERIES):
+            cached.get_distance(pos[i % size], pos[(i + 1) % size])
+        cached.get_distances(pos[:QUERIES, None], pos[:QUERIES])
+        return QUERIES + min(size, QUERIES) ** 2
+    cached = space.CachedSpace(options.index)
+    return lambda: np.random.rand(size, 2), run
+
+def get_heading(size, options):
+    def run(pos):
+        for i in range(QUERIES):
+            cached.get_heading(pos[i % size], pos[(i + 1) % size])
+        cached.get_headings(pos[:QUERIES, None], pos[:QUERIES])
+        return QUERIES + min(size, QUERIES) ** 2
+    cached = space.CachedSpace(options.index)
+    return lambda: np.random.rand(size, 2), run
+
+def agent_step(size, options):
+    def run(m):
+        m.step()
+        return len(m.schedule.agents)
+    return lambda: model(size, options), run
+
+# the two phases of an object engine step, Agent.step then Agent.advance
+def agent_decide(size, options):
+    def run(m):
+        m.draw()
+        m.schedule.do_each('step')
+        return len(m.schedule.agents)
+    return lambda: model(size, options), run
+
+def agent_advance(size, options):
+    def setup():
+        m = model(size, options)
+        m.draw()
+        m.schedule.do_each('step')
+        return m
+    def run(m):
+        m.schedule.do_each('advance')
+        return len(m.schedule.agents)
+    return setup, run
+
+def run_simulation(size, options):
+    def run(species):
+        Environment(options.steps, engine=options.engine, index=options.index).run_simulation(species, 0)
+        return options.steps * size
+    return lambda: toolbox(size).population()[0], run
+
+def generation(size, options):
+    def setup():
+        checkpoint = tempfile.TemporaryDirectory()
+        return checkpoint, Experiment(toolbox(size), epochs=1, checkpoint=checkpoint.name, seed=options.seed,
+                                      steps=options.steps, history=1)
+    def run(state):
+        _, experiment = state
+        experiment.step()
+        return size
+    def teardown(state):
+        checkpoint, experiment = state
+        experiment.close()
+        checkpoint.cleanup()
+    return setup, run, teardown
+
+BENCHMARKS = {
+    'space_update':   space_update,
+    'get_neighbors':  get_neighbors,
+    'get_distance':   get_distance,
+    'get_heading':    get_heading,
+    'agent_step':     agent_step,
+    'agent_decide':   agent_decide,
+    'agent_advance':  agent_advance,
+    'run_simulation': run_simulation,
+    'generation':     generation,
+}
+
+def measure(benchmark, size, options):
+    setup, run, *teardown = BENCHMARKS[benchmark](size, options)
+    teardown = teardown[0] if teardown else lambda state: None
+    times = []
+    for repeat in range(options.repeats):
+        seed_all(options.seed + repeat)
+        state = setup()
+        try:
+            start = time.perf_counter()
+            operations = run(state)
+            times.append(time.perf_counter() - start)
+        finally:
+            teardown(state)
+
+    seed_all(options.seed)
+    state = setup()
+    try:
+        tracemalloc.start()
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        teardown(state)
+
+    seconds = min(times)
+    return {
+        'name':       benchmark,
+        'size':       size,
+        'seconds':    seconds,
+        'median':     float(np.median(times)),
+        'throughput': operations / seconds if seconds else float('inf'),
+        'peak_bytes': peak,
+    }
+
+def metadata(options):
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                         cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit':  commit,
+        'date':    datetime.datetime.now().isoformat(),
+        'python':  platform.python_version(),
+        'numpy':   np.__version__,
+        'options': {k: v for k, v in vars(options).items() if k not in ('output', 'compare')},
+    }
+
+def run(options, out=sys.stdout):
+    results = []
+    for benchmark in options.benchmarks:
+        for size in options.sizes:
+            result = measure(benchmark, size, options)
+            out.write('%-15s %6d %10.4fs %14.1f/s %12d B\n' % (
+                benchmark, size, result['seconds'], result['throughput'], result['peak_bytes']))
+            out.flush()
+            results.append(result)
+    return {'meta': metadata(options), 'results': results}
+
+# pairs of (baseline, current) results slower than baseline by more than tolerance
+def compare(baseline, current, tolerance=.2):
+    old = {(r['name'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = old.get((result['name'], result['size']))
+        if base is not None and result['seconds'] > base['seconds'] * (1 + tolerance):
+            regressions.append((base, result))
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Times space queries, agent steps and full generations.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--steps', type=int, default=5, help='simulation steps of run_simulation and generation')
+    parser.add_argument('--engine', default='object')
+    parser.add_argument('--index', default='grid')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--compare', help='JSON results of a previous run')
+    parser.add_argument('--tolerance', type=float, default=.2)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    results = run(options)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=1)
+
+    if options.compare:
+        with open(options.compare) as f:
+            regressions = compare(json.load(f), results, options.tolerance)
+        for base, result in regressions:
+            print('REGRESSION %s[%d]: %.4fs -> %.4fs' % (result['name'], result['size'],
+                                                        base['seconds'], result['seconds']))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import io
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import benchmark
+
+
+def results(*timings):
+    return {'results': [{'name': name, 'size': size, 'seconds': seconds} for name, size, seconds in timings]}
+
+class CompareTest(TestCase):
+    def test_regressions(self):
+        baseline = results(('get_neighbors', 100, 1.), ('agent_step', 100, 1.))
+        current = results(('get_neighbors', 100, 1.1), ('agent_step', 100, 1.5), ('generation', 100, 9.))
+
+        regressions = benchmark.compare(baseline, current, tolerance=.2)
+
+        self.assertEqual([(base['name'], result['seconds']) for base, result in regressions], [('agent_step', 1.5)])
+
+class RunTest(TestCase):
+    def test_run(self):
+        options = benchmark.parse_args(['--sizes', '20', '--repeats', '1', '--steps', '1',
+                                        '--benchmarks', 'space_update', 'get_neighbors', 'agent_step',
+                                        'agent_decide', 'agent_advance'])
+        report = benchmark.run(options, io.StringIO())
+
+        self.assertEqual([r['name'] for r in report['results']],
+                         ['space_update', 'get_neighbors', 'agent_step', 'agent_decide', 'agent_advance'])
+        for result in report['results']:
+            self.assertGreater(result['throughput'], 0)
+            self.assertGreater(result['peak_bytes'], 0)
+        self.assertEqual(report['meta']['options']['sizes'], [20])
+
+    def test_model_uses_index(self):
+        options = benchmark.parse_args(['--index', 'dense'])
+        self.assertIsInstance(benchmark.model(20, options).space._index, benchmark.space.INDEXES['dense'])
+
+    def test_generation_cleans_up(self):
+        directories, directory = [], tempfile.TemporaryDirectory
+        def track():
+            directories.append(directory())
+            return directories[-1]
+        options = benchmark.parse_args(['--repeats', '2', '--steps', '1'])
+        with mock.patch('tempfile.TemporaryDirectory', track):
+            benchmark.measure('generation', 4, options)
+        self.assertEqual(len(directories), 3)
+        self.assertFalse(any(os.path.exists(d.name) for d in directories))
@@ -1,61 +1,135 @@
 import os
+import contextlib
+import random
+
+import numpy as np
+from deap import tools
 
 from simulation.environment import Environment
-from gen.logging import Stats
+from simulation.parallel import ReplicatedEnvironment
+from simulation.profiling import PROFILER
+from simulation.progress import SILENT
+from gen.logging import Stats, JsonlSink, TextSink
 from gen.checkpoints import CheckpointManager
+from gen.writer import BackgroundWriter
 
 
-def summary_decorator(checkpoint, logger):
-    def summary(foo):
+# the profiler is shared by the process, so it only runs during the
+# simulations of the experiment which asked for it
+def profile_decorator(profiler, sink, stats):
+    def profile(foo):
         def wrapper(*args, **kwargs):
-            ret = foo(*args, **kwargs)
-            with open(os.path.join(checkpoint.checkpoint_dir, 'summary.txt'), 'w') as f:
-                f.write(str(logger))
+            profiler.reset()
+            profiler.enable()
+            try:
+                ret = foo(*args, **kwargs)
+            finally:
+                profiler.disable()
+            sink.write(dict(gen=stats.iteration - 1, **profiler.reset()), None)
 
             return ret
 
         return wrapper
-    return summary
+    return profile
 
 class Experiment:
-    def __init__(self, toolbox, epochs=50, checkpoint=None):
-        self.environment = Environment()
-        self.checkpoints = CheckpointManager(checkpoint)
-        self.setup_toolbox(toolbox)
-        self.epochs = epochs
-
-        if self.checkpoints.last_epoch >= 0:
-            self.load_state()
+    def __init__(self, toolbox, epochs=50, checkpoint=None, replicates=1, processes=None,
+                 reducer=np.mean, steps=500, checkpoint_format='pickle', background=False,
+                 history=100, profile=False, progress=SILENT, seed=None, stop=('empty',), budget=None,
+                 regrowth=None):
+        if replicates > 1 or processes is not None:
+            self.environment = ReplicatedEnvironment(steps, replicates=replicates, processes=processes,
+                                                     reducer=reducer, stop=stop, budget=budget,
+                                                     regrowth=regrowth)
         else:
-            self.init_state()
-
-    def setup_toolbox(self, toolbox):
+            self.environment = Environment(steps, progress=progress, stop=stop, budget=budget,
+                                           regrowth=regrowth)
+        self.writer = None
+        # the pool and the writer are not left running when e.g. a checkpoint fails to load
+        try:
+            self.writer = BackgroundWriter() if background else None
+            self.checkpoints = CheckpointManager(checkpoint, checkpoint_format, self.writer)
+            self.setup_toolbox(toolbox, history, profile, progress)
+            self.epochs = epochs
+            # root of the seeds of every epoch, may be a child SeedSequence of a larger run
+            self.seeds = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+            if self.checkpoints.last_epoch >= 0:
+                self.load_state()
+            else:
+                self.init_state()
+        except BaseException:
+            with contextlib.suppress(Exception):
+                self.close()
+            raise
+
+    def setup_toolbox(self, toolbox, history=None, profile=False, progress=SILENT):
         self.toolbox = toolbox
-        self.stats = Stats()
+        directory = self.checkpoints.checkpoint_dir
+        self.stats = Stats(history, [TextSink(os.path.join(directory, 'summary.txt'), self.writer),
+                                     JsonlSink(os.path.join(directory, 'summary.jsonl'), self.writer)],
+                           progress)
         self.toolbox.register('run_simulation', self.environment.run_simulation)
         self.toolbox.decorate('run_simulation', self.stats.log_decorator,
-                                                self.checkpoints.save_decorator,
-                                                summary_decorator(self.checkpoints, self.stats.logbook))
+                                                self.checkpoints.save_decorator)
+        if profile:
+            sink = JsonlSink(os.path.join(directory, 'profile.jsonl'), self.writer)
+            self.toolbox.decorate('run_simulation', profile_decorator(PROFILER, sink, self.stats))
 
     def init_state(self):
         self.iteration = 0
+        self.checkpoints.save_seeds(self.seeds)
+        self.seed_operators(0)
 
         population, = self.toolbox.population()
-        self.population, = self.toolbox.run_simulation(population, self.random_seed())
+        self.population, = self.toolbox.run_simulation(population, self.random_seed(0))
 
+    # The evaluated population of the last epoch is restored as it was saved,
+    # only an epoch interrupted during its simulation is simulated again.
     def load_state(self):
-        self.iteration   = self.checkpoints.last_epoch
-        population, seed = self.checkpoints.load_epoch(self.iteration)
-
-        self.population, = self.toolbox.run_simulation(population, seed)
+        self.iteration = self.checkpoints.last_epoch
+        self.seeds = self.checkpoints.load_seeds() or self.seeds
 
-    def run(self):
-        while not self.finished():
-            population, = self.toolbox.select(self.population)
-            population, = self.toolbox.new_population(population)
-            population, = self.toolbox.run_simulation(population, self.random_seed())
-
-            self.update_results(population)
+        results = self.checkpoints.load_results(self.iteration)
+        if results is not None:
+            self.population, _ = results
+            self.stats.iteration = self.iteration + 1
+        else:
+            population, seed = self.checkpoints.load_epoch(self.iteration)
+            self.checkpoints.rewind(self.iteration)
+            self.stats.iteration = self.iteration
+            self.population, = self.toolbox.run_simulation(population, seed)
+
+    def run(self, epochs=None):
+        stop = self.epochs if epochs is None else min(self.epochs, self.iteration + epochs)
+        try:
+            while self.iteration < stop:
+                self.step()
+        except BaseException:
+            # what is already queued still reaches the disk, but a write
+            # error must not hide the one which stopped the run
+            with contextlib.suppress(Exception):
+                self.flush()
+            raise
+        self.flush()
+
+    def step(self):
+        self.seed_operators(self.iteration + 1)
+        population, = self.toolbox.select(self.population)
+        population, = self.toolbox.new_population(population)
+        population, = self.toolbox.run_simulation(population, self.random_seed(self.iteration + 1))
+
+        self.update_results(population)
+
+    def best(self, k):
+        return [tools.selBest(population, k) for population in self.population]
+
+    # migrants replace the worst individuals of each specie
+    def immigrate(self, migrants):
+        for population, individuals in zip(self.population, migrants):
+            worst = sorted(range(len(population)), key=lambda i: population[i].fitness)
+            for i, individual in zip(worst, individuals):
+                population[i] = individual
 
     def finished(self):
         return self.iteration >= self.epochs
@@ -64,7 +138,35 @@ class Experiment:
         self.iteration += 1
         self.population = population
 
-    def random_seed(self):
-        import datetime
-        now = datetime.datetime.now()
-        return now.microsecond
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        if hasattr(self.environment, 'close'):
+            self.environment.close()
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    # an error leaving the block is not hidden by one closing the experiment
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            with contextlib.suppress(Exception):
+                self.close()
+
+    def child_seeds(self, *key):
+        return np.random.SeedSequence(self.seeds.entropy, spawn_key=self.seeds.spawn_key + key)
+
+    # seed of the simulation which evaluates the given epoch
+    def random_seed(self, epoch):
+        return int(self.child_seeds(0, epoch).generate_state(1)[0])
+
+    # DEAP operators draw from the global generator, which is reseeded for
+    # every epoch so a resumed run draws what an uninterrupted one would
+    def seed_operators(self, epoch):
+        random.seed(int(self.child_seeds(1, epoch).generate_state(1)[0]))
@@ -0,0 +1,102 @@
+import os
+import pickle
+import tempfile
+from unittest import TestCase, mock
+
+from experiment import Experiment
+from gen.logging import read_stats
+from simulation.parallel import ReplicatedEnvironment
+from simulation.profiling import PROFILER
+import gen.toolboxes as tbx
+
+
+def toolbox():
+    return tbx.environment(tbx.darwinian(tbx.sheep(4)), tbx.lamarckian(tbx.wolves(2)))
+
+def outcomes(population):
+    return [[(list(ind), ind.fitness.values, ind.outcome) for ind in specie] for specie in population]
+
+class ResumeTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def experiment(self, checkpoint=None, **kwargs):
+        return Experiment(toolbox(), epochs=3, checkpoint=checkpoint or self.tmp.name, steps=3, seed=1, **kwargs)
+
+    def test_resume_restores_evaluated_population(self):
+        for checkpoint_format in ('pickle', 'columnar'):
+            with self.subTest(checkpoint_format), tempfile.TemporaryDirectory() as checkpoint:
+                with self.experiment(checkpoint, checkpoint_format=checkpoint_format) as experiment:
+                    experiment.run(1)
+                    expected = outcomes(experiment.population)
+
+                with mock.patch('simulation.environment.Environment.run_simulation') as run_simulation:
+                    with self.experiment(checkpoint, checkpoint_format=checkpoint_format) as resumed:
+                        self.assertFalse(run_simulation.called)
+                        self.assertEqual((resumed.iteration, resumed.stats.iteration), (1, 2))
+                        self.assertEqual(outcomes(resumed.population), expected)
+                        self.assertEqual(resumed.checkpoints.last_epoch, 1)
+
+    def test_resumed_run_matches_uninterrupted_run(self):
+        with tempfile.TemporaryDirectory() as checkpoint, self.experiment(checkpoint) as experiment:
+            experiment.run()
+            expected = outcomes(experiment.population)
+
+        with self.experiment() as experiment:
+            experiment.run(1)
+        with self.experiment() as resumed:
+            resumed.run()
+            self.assertEqual(outcomes(resumed.population), expected)
+
+    def test_resumes_unseeded_run(self):
+        with Experiment(toolbox(), epochs=2, checkpoint=self.tmp.name, steps=3) as experiment:
+            experiment.run(1)
+        with Experiment(toolbox(), epochs=2, checkpoint=self.tmp.name, steps=3) as resumed:
+            self.assertEqual(resumed.seeds.entropy, experiment.seeds.entropy)
+
+    def test_interrupted_simulation_is_run_again(self):
+        with self.experiment() as experiment:
+            experiment.run(1)
+        with mock.patch('simulation.environment.Environment.run_simulation', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt), self.experiment() as experiment:
+                experiment.run()
+
+        with self.experiment() as resumed:
+            self.assertEqual((resumed.iteration, resumed.stats.iteration, resumed.checkpoints.last_epoch),
+                             (2, 3, 2))
+            resumed.run()
+            self.assertEqual(resumed.checkpoints.saved_epochs().count(3), 1)
+            self.assertEqual(sorted(resumed.checkpoints.saved_epochs()), [0, 1, 2, 3])
+
+    def test_write_errors_do_not_hide_interrupts(self):
+        with mock.patch('gen.writer.BackgroundWriter.flush', side_effect=OSError):
+            with self.assertRaises(KeyboardInterrupt), self.experiment(background=True) as experiment:
+                with mock.patch.object(experiment, 'step', side_effect=KeyboardInterrupt):
+                    experiment.run()
+
+    def test_failed_init_closes_pool(self):
+        with open(os.path.join(self.tmp.name, '0.pkl'), 'wb') as f:
+            f.write(b'not a pickle')
+        close = ReplicatedEnvironment.close
+        with mock.patch.object(ReplicatedEnvironment, 'close', autospec=True, side_effect=close) as closed:
+            with self.assertRaises(pickle.UnpicklingError):
+                self.experiment(replicates=2, processes=1)
+        self.assertEqual(closed.call_count, 1)
+
+class ProfileTest(TestCase):
+    def test_profiler_is_scoped_to_experiment(self):
+        with tempfile.TemporaryDirectory() as checkpoint:
+            with Experiment(toolbox(), epochs=2, checkpoint=checkpoint, steps=3, seed=1, profile=True) as experiment:
+                experiment.run()
+            profile = read_stats(os.path.join(checkpoint, 'profile.jsonl'))
+            self.assertEqual(list(profile['gen']), [0, 1, 2])
+            self.assertFalse(PROFILER.enabled)
+            self.assertEqual(PROFILER.report(), {})
+
+        with tempfile.TemporaryDirectory() as checkpoint:
+            with Experiment(toolbox(), epochs=1, checkpoint=checkpoint, steps=3, seed=1) as experiment:
+                experiment.run()
+            self.assertEqual(PROFILER.report(), {})
@@ -1,10 +1,95 @@
 import os
+import re
 import glob
+import json
 import pickle
 import datetime
 
+import numpy as np
+from deap import creator
+
+from gen.writer import durable_write
+
+EPOCH_FILE = re.compile(r'^(\d+)\.(pkl|npz)$')
+SEEDS_FILE = 'seeds.json'
+
+# snapshot() is taken on the caller side, write() may run in the background
+class PickleFormat:
+    extension = 'pkl'
+
+    # pickled bytes are the copy, several times cheaper than a deepcopy
+    def snapshot(self, population, seed):
+        return pickle.dumps([population, seed])
+
+    def write(self, path, snapshot):
+        durable_write(path, lambda f: f.write(snapshot))
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+# one .npz per epoch holding typed genome, fitness and outcome arrays of each
+# specie, individuals are rebuilt from creator classes stored by name
+class ColumnarFormat:
+    extension = 'npz'
+    version = 2
+
+    def snapshot(self, population, seed):
+        arrays = {
+            'version': np.array(self.version),
+            'seed':    np.array(seed),
+            'created': np.array(datetime.datetime.now().isoformat()),
+            'species': np.array([type(specie[0]).__name__ if specie else '' for specie in population]),
+        }
+        for i, specie in enumerate(population):
+            arrays['genes_%d' % i], arrays['fitness_%d' % i], arrays['outcome_%d' % i] = self.columns(specie)
+        return arrays
+
+    def write(self, path, snapshot):
+        durable_write(path, lambda f: np.savez(f, **snapshot))
+
+    def columns(self, specie):
+        if not specie:
+            return np.zeros((0, 0)), np.zeros((0, 0)), np.zeros((0, 0))
+        genes = np.array(specie, dtype=float).reshape(len(specie), -1)
+        fitness = np.full((len(specie), len(specie[0].fitness.weights)), np.nan)
+        outcome = np.full((len(specie), max(len(getattr(ind, 'outcome', ())) for ind in specie)), np.nan)
+        for row, outcome_row, individual in zip(fitness, outcome, specie):
+            if individual.fitness.valid:
+                row[:] = individual.fitness.values
+            if hasattr(individual, 'outcome'):
+                outcome_row[:] = individual.outcome
+        return genes, fitness, outcome
+
+    def load(self, path):
+        with np.load(path) as data:
+            population = [self.individuals(getattr(creator, name) if name else None,
+                                           data['genes_%d' % i], data['fitness_%d' % i],
+                                           data.get('outcome_%d' % i))
+                          for i, name in enumerate(data['species'])]
+            return [population, data['seed'].item()]
+
+    # outcome is missing from version 1 files
+    def individuals(self, cls, genes, fitness, outcome=None):
+        if outcome is None or not outcome.size:
+            outcome = np.full((len(genes), 0), np.nan)
+        specie = []
+        for ind_genes, ind_fitness, ind_outcome in zip(genes, fitness, outcome):
+            individual = cls(ind_genes.tolist())
+            if not np.isnan(ind_fitness).any():
+                individual.fitness.values = tuple(ind_fitness.tolist())
+            if len(ind_outcome) and not np.isnan(ind_outcome).any():
+                individual.outcome = tuple(ind_outcome.tolist())
+            specie.append(individual)
+        return specie
+
+FORMATS = {
+    'pickle':   PickleFormat,
+    'columnar': ColumnarFormat,
+}
+
 class CheckpointManager:
-    def __init__(self, checkpoint_dir):
+    def __init__(self, checkpoint_dir, format='pickle', writer=None):
         if checkpoint_dir is None:
             checkpoint_dir = os.path.join('checkpoints', str(datetime.datetime.now().strftime('%Y_%m_%d_%H_%M_%S')))
 
@@ -12,26 +97,79 @@ class CheckpointManager:
             os.makedirs(checkpoint_dir)
 
         self.checkpoint_dir = checkpoint_dir
-        self.last_epoch = int(os.path.basename(max(glob.glob(os.path.join(checkpoint_dir, '*.pkl')),
-                                                   default='-1.pkl'))[:-4])
+        self.format = FORMATS[format]()
+        self.writer = writer
+        self.last_epoch = max(self.saved_epochs(), default=-1)
+
+    def saved_epochs(self):
+        matches = (EPOCH_FILE.match(os.path.basename(path))
+                   for path in glob.glob(os.path.join(self.checkpoint_dir, '*')))
+        return [int(match.group(1)) for match in matches if match]
+
+    def checkpoint_path(self, epoch, extension=None):
+        return os.path.join(self.checkpoint_dir, '%d.%s' % (epoch, extension or self.format.extension))
+
+    # evaluated population of an epoch, named so EPOCH_FILE does not match it
+    def results_path(self, epoch, extension=None):
+        return os.path.join(self.checkpoint_dir, '%d.results.%s' % (epoch, extension or self.format.extension))
 
-    def checkpoint_path(self, epoch):
-        return os.path.join(self.checkpoint_dir, '%d.pkl' % epoch)
+    def write(self, path, population, seed):
+        snapshot = self.format.snapshot(population, seed)
+        if self.writer is not None:
+            self.writer.submit(self.format.write, path, snapshot)
+        else:
+            self.format.write(path, snapshot)
 
     def save(self, population, seed):
         self.last_epoch += 1
+        self.write(self.checkpoint_path(self.last_epoch), population, seed)
 
-        with open(self.checkpoint_path(self.last_epoch), 'wb') as f:
-            pickle.dump([population, seed], f)
+    def save_results(self, population, seed):
+        self.write(self.results_path(self.last_epoch), population, seed)
 
+    # the population is saved before and after its simulation
     def save_decorator(self, foo):
         def wrapper(population, seed, *args, **kwargs):
             self.save(population, seed)
+            ret = foo(population, seed, *args, **kwargs)
+            self.save_results(ret[0], seed)
 
-            return foo(population, seed, *args, **kwargs)
+            return ret
 
         return wrapper
 
+    # root SeedSequence of the run, so runs seeded with None can be resumed
+    def save_seeds(self, seeds):
+        state = {'entropy': seeds.entropy, 'spawn_key': list(seeds.spawn_key)}
+        durable_write(os.path.join(self.checkpoint_dir, SEEDS_FILE), lambda f: json.dump(state, f), 'w')
+
+    # None for runs checkpointed before the seeds were saved
+    def load_seeds(self):
+        path = os.path.join(self.checkpoint_dir, SEEDS_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            state = json.load(f)
+        return np.random.SeedSequence(state['entropy'], spawn_key=tuple(state['spawn_key']))
+
+    # the next save overwrites the given epoch
+    def rewind(self, epoch):
+        self.last_epoch = epoch - 1
+
+    # epochs are read back in whichever format they were written
     def load_epoch(self, epoch):
-        with open(self.checkpoint_path(epoch), 'rb') as f:
-            return pickle.load(f)
+        return self.load(self.checkpoint_path, epoch)
+
+    # None when the simulation of the epoch has not finished
+    def load_results(self, epoch):
+        try:
+            return self.load(self.results_path, epoch)
+        except FileNotFoundError:
+            return None
+
+    def load(self, path_of, epoch):
+        for checkpoint_format in FORMATS.values():
+            path = path_of(epoch, checkpoint_format.extension)
+            if os.path.exists(path):
+                return checkpoint_format().load(path)
+        raise FileNotFoundError(path_of(epoch))
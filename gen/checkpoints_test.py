@@ -0,0 +1,98 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from gen.checkpoints import CheckpointManager
+from gen.writer import BackgroundWriter
+import gen.toolboxes as tbx
+
+class CheckpointManagerTest(TestCase):
+    FORMAT = 'pickle'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = CheckpointManager(self.tmp.name, self.FORMAT)
+        self.population, = tbx.environment(tbx.sheep(3), tbx.wolves(2)).population()
+        for i, individual in enumerate(self.population[0]):
+            individual.fitness.values = i, 2. * i
+            individual.outcome = i, 2. * i, 3
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        self.manager.save(self.population, 42)
+        population, seed = self.manager.load_epoch(0)
+
+        self.assertEqual(seed, 42)
+        self.assertEqual(population, self.population)
+        for loaded, saved in zip(population, self.population):
+            self.assertEqual([type(ind).__name__ for ind in loaded], [type(ind).__name__ for ind in saved])
+            self.assertEqual([ind.fitness.values for ind in loaded],
+                             [ind.fitness.values for ind in saved])
+
+    def test_background_save_snapshots_population(self):
+        writer = BackgroundWriter()
+        manager = CheckpointManager(self.tmp.name, self.FORMAT, writer)
+        manager.save(self.population, 42)
+        expected = [[list(ind) for ind in specie] for specie in self.population]
+        self.population[0][0][0] = -1
+        writer.close()
+
+        population, seed = manager.load_epoch(0)
+        self.assertEqual([[list(ind) for ind in specie] for specie in population], expected)
+
+    def test_last_epoch(self):
+        self.assertEqual(self.manager.last_epoch, -1)
+        self.manager.save(self.population, 1)
+        self.manager.save(self.population, 2)
+        self.assertEqual(CheckpointManager(self.tmp.name, self.FORMAT).last_epoch, 1)
+
+    def test_results_round_trip(self):
+        self.manager.save(self.population, 42)
+        self.assertIsNone(self.manager.load_results(0))
+        self.manager.save_results(self.population, 42)
+        population, seed = self.manager.load_results(0)
+
+        self.assertEqual((population, seed), (self.population, 42))
+        self.assertEqual([ind.outcome for ind in population[0]], [ind.outcome for ind in self.population[0]])
+        self.assertFalse(any(hasattr(ind, 'outcome') for ind in population[1]))
+        self.assertEqual(CheckpointManager(self.tmp.name, self.FORMAT).last_epoch, 0)
+
+    def test_save_decorator(self):
+        def simulate(population, seed):
+            population[0][0].fitness.values = -1, -1
+            return population,
+        self.manager.save_decorator(simulate)(self.population, 42)
+
+        before, _ = self.manager.load_epoch(0)
+        after, _ = self.manager.load_results(0)
+        self.assertEqual(before[0][0].fitness.values, (0, 0))
+        self.assertEqual(after[0][0].fitness.values, (-1, -1))
+
+    def test_seeds(self):
+        self.assertIsNone(self.manager.load_seeds())
+        seeds = np.random.SeedSequence().spawn(2)[1]
+        self.manager.save_seeds(seeds)
+        loaded = self.manager.load_seeds()
+        self.assertEqual((loaded.entropy, loaded.spawn_key), (seeds.entropy, seeds.spawn_key))
+
+    def test_rewind(self):
+        self.manager.save(self.population, 1)
+        self.manager.rewind(0)
+        self.manager.save(self.population, 2)
+        self.assertEqual((self.manager.last_epoch, self.manager.load_epoch(0)[1]), (0, 2))
+
+    def test_ignores_other_files(self):
+        open(os.path.join(self.tmp.name, 'summary.txt'), 'w').close()
+        self.assertEqual(CheckpointManager(self.tmp.name, self.FORMAT).last_epoch, -1)
+
+class ColumnarCheckpointManagerTest(CheckpointManagerTest):
+    FORMAT = 'columnar'
+
+    def test_reads_pickled_epochs(self):
+        CheckpointManager(self.tmp.name).save(self.population, 7)
+        population, seed = CheckpointManager(self.tmp.name, self.FORMAT).load_epoch(0)
+        self.assertEqual((population, seed), (self.population, 7))
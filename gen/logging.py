@@ -1,6 +1,10 @@
 from deap import tools
 import numpy as np
-import sys
+import json
+import time
+
+from simulation.progress import SILENT
+from simulation.serialization import to_builtin
 
 def stats(specie_idx):
     def wrapper(pop):
@@ -16,8 +20,56 @@ def debug(foo):
         return foo(*args, **kwargs)
     return wrapper
 
+def append_line(path, line):
+    with open(path, 'a') as f:
+        f.write(line + '\n')
+
+# Sinks append one entry per generation, so a write never depends on the
+# length of the run. With a BackgroundWriter the appends run off the caller.
+class Sink:
+    def __init__(self, path, writer=None):
+        self.path = path
+        self.writer = writer
+
+    def write(self, record, text):
+        line = self.format(record, text)
+        if self.writer is not None:
+            self.writer.submit(append_line, self.path, line)
+        else:
+            append_line(self.path, line)
+
+class JsonlSink(Sink):
+    def format(self, record, text):
+        return json.dumps(record, default=to_builtin)
+
+class TextSink(Sink):
+    def format(self, record, text):
+        return text
+
+def flatten(record, prefix=''):
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+# loads a JsonlSink file as columns, e.g. columns['sheep.avg']
+def read_stats(path):
+    with open(path) as f:
+        records = [flatten(json.loads(line)) for line in f if line.strip()]
+    keys = dict.fromkeys(key for record in records for key in record)
+    return {key: np.array([record.get(key) for record in records]) for key in keys}
+
+def trim(logbook, history):
+    list.__delitem__(logbook, slice(None, -history))
+    logbook.buffindex = len(logbook)
+    for chapter in logbook.chapters.values():
+        trim(chapter, history)
+
 class Stats:
-    def __init__(self):
+    def __init__(self, history=None, sinks=(), progress=SILENT):
         s_stats = tools.Statistics(stats(0))
         w_stats = tools.Statistics(stats(1))
         self.stats = tools.MultiStatistics(sheep=s_stats, wolves=w_stats)
@@ -35,14 +87,27 @@ class Stats:
         self.logbook.columns_len = [4, 33, 33]
 
         self.iteration = 0
+        self.history = history
+        self.sinks = list(sinks)
+        self.progress = progress
 
     def log_decorator(self, foo):
         def wrapper(population, *args):
+            start = time.perf_counter()
             population, = foo(population, *args)
+            seconds = time.perf_counter() - start
 
-            self.logbook.record(gen=self.iteration, **self.stats.compile([population]))
+            record = dict(gen=self.iteration, **self.stats.compile([population]))
+            self.logbook.record(**record)
             self.iteration += 1
-            sys.stdout.write("\r%s\n" % self.logbook.stream,)
+            text = self.logbook.stream
+            for sink in self.sinks:
+                sink.write(record, text)
+            if self.history is not None and len(self.logbook) > self.history:
+                trim(self.logbook, self.history)
+            if self.progress.due('generation'):
+                self.progress.event('generation', gen=record['gen'], seconds=seconds, text=text,
+                                    sheep=record['sheep'], wolves=record['wolves'])
 
             return population,
 
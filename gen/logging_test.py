@@ -1,5 +1,9 @@
+import os
+import tempfile
 from unittest import TestCase, mock
 
+import numpy as np
+
 import gen.logging as log
 import gen.toolboxes as tbx
 
@@ -19,3 +23,54 @@ class TestLogging(TestCase):
     def test_logging(self):
         self.foo_mock.return_value = (self.pop,)
         self.logger([])
+
+class TestSinks(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.jsonl = os.path.join(self.tmp.name, 'summary.jsonl')
+        self.text = os.path.join(self.tmp.name, 'summary.txt')
+        self.stats = log.Stats(history=2, sinks=[log.JsonlSink(self.jsonl), log.TextSink(self.text)])
+        self.pop, = tbx.environment(tbx.sheep(3), tbx.wolves(3)).population()
+        for spec in self.pop:
+            for ind in spec:
+                ind.fitness.values = 1, 2
+        self.logger = self.stats.log_decorator(mock.MagicMock(return_value=(self.pop,)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_appends_one_record_per_generation(self):
+        for _ in range(5):
+            self.logger([])
+
+        stats = log.read_stats(self.jsonl)
+        np.testing.assert_array_equal(stats['gen'], range(5))
+        np.testing.assert_array_equal(stats['sheep.avg'], [1.5] * 5)
+        np.testing.assert_array_equal(stats['wolves.alive'], [3] * 5)
+
+    def test_history_is_bounded(self):
+        for _ in range(5):
+            self.logger([])
+
+        self.assertEqual([record['gen'] for record in self.stats.logbook], [3, 4])
+        self.assertEqual(len(self.stats.logbook.chapters['sheep']), 2)
+
+    def test_text_summary(self):
+        for _ in range(3):
+            self.logger([])
+
+        with open(self.text) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[-1].split()[0], '2')
+
+    def test_reports_generations(self):
+        reporter = mock.MagicMock()
+        self.stats.progress = reporter
+        self.logger([])
+
+        name, = reporter.event.call_args.args
+        fields = reporter.event.call_args.kwargs
+        self.assertEqual(name, 'generation')
+        self.assertEqual(fields['gen'], 0)
+        self.assertEqual(fields['wolves']['alive'], 3)
+        self.assertGreaterEqual(fields['seconds'], 0)
@@ -0,0 +1,67 @@
+import random
+
+import numpy as np
+
+
+# Variation and selection over a whole specie at once: genes is an
+# (individuals, genes) matrix and fitness a matching (individuals, objectives)
+# matrix of weighted values. Draws come from a generator seeded by the global
+# random module, which Experiment seeds, so runs stay reproducible.
+def generator():
+    return np.random.default_rng(random.getrandbits(64))
+
+def genes_matrix(population):
+    return np.array(population, dtype=float).reshape(len(population), -1)
+
+def wvalues_matrix(population):
+    return np.array([ind.fitness.wvalues for ind in population], dtype=float).reshape(len(population), -1)
+
+# rows of tournament winners, fitness compared lexicographically like DEAP
+def tournament(wvalues, k, tournsize, rng):
+    rank = np.empty(len(wvalues), dtype=int)
+    rank[np.lexsort(wvalues.T[::-1])] = np.arange(len(wvalues))
+    aspirants = rng.integers(len(wvalues), size=(k, tournsize))
+    return aspirants[np.arange(k), np.argmax(rank[aspirants], axis=1)]
+
+# cxTwoPoint applied with probability cxpb to the pairs of consecutive rows
+def two_point_crossover(genes, cxpb, rng):
+    genes = genes.copy()
+    pairs, size = len(genes) // 2, genes.shape[1]
+    if not pairs or size < 2:
+        return genes
+    first, second = genes[0:2*pairs:2], genes[1:2*pairs:2]
+    cx1 = rng.integers(1, size + 1, pairs)
+    cx2 = rng.integers(1, size, pairs)
+    cx2 = np.where(cx2 >= cx1, cx2 + 1, cx2)
+    low, high = np.minimum(cx1, cx2), np.maximum(cx1, cx2)
+    columns = np.arange(size)
+    swap = (columns >= low[:, None]) & (columns < high[:, None]) & (rng.random(pairs) < cxpb)[:, None]
+    first[swap], second[swap] = second[swap], first[swap]
+    return genes
+
+# mutGaussian applied with probability mutpb to every row
+def gaussian_mutation(genes, mutpb, mu, sigma, indpb, rng):
+    mutated = (rng.random(len(genes)) < mutpb)[:, None] & (rng.random(genes.shape) < indpb)
+    return genes + mutated * rng.normal(mu, sigma, genes.shape)
+
+def no_mutation(genes, mutpb, rng):
+    return genes
+
+def clip(genes, low=0, high=1):
+    return np.clip(genes, low, high)
+
+# vectorized counterparts of tools.selTournament and algorithms.varAnd,
+# working on DEAP populations so the rest of the toolbox is unchanged
+def select_tournament(population, k, tournsize):
+    if not population:
+        return []
+    return [population[i] for i in tournament(wvalues_matrix(population), k, tournsize, generator())]
+
+def vary(population, toolbox, cxpb, mutpb):
+    if not population:
+        return []
+    rng = generator()
+    genes = two_point_crossover(genes_matrix(population), cxpb, rng)
+    genes = toolbox.mutate_array(genes, mutpb, rng)
+    cls = type(population[0])
+    return [cls(row) for row in genes.tolist()]
@@ -0,0 +1,62 @@
+from unittest import TestCase
+import random
+
+import numpy as np
+from deap import creator
+
+from gen import operators, toolboxes
+
+
+class TestOperators(TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(42)
+        self.genes = self.rng.random((10, 7))
+
+    def test_crossover_swaps_one_segment_per_pair(self):
+        crossed = operators.two_point_crossover(self.genes, 1., self.rng)
+        for i in range(0, 10, 2):
+            swapped = crossed[i] != self.genes[i]
+            np.testing.assert_array_equal(crossed[i, swapped], self.genes[i + 1, swapped])
+            np.testing.assert_array_equal(crossed[i + 1, swapped], self.genes[i, swapped])
+            columns, = np.nonzero(swapped)
+            self.assertTrue(len(columns) and np.all(np.diff(columns) == 1))
+            self.assertLess(len(columns), 7)
+
+    def test_no_crossover(self):
+        np.testing.assert_array_equal(operators.two_point_crossover(self.genes, 0., self.rng), self.genes)
+
+    def test_mutation(self):
+        np.testing.assert_array_equal(operators.gaussian_mutation(self.genes, 0., 0, 1, 1., self.rng), self.genes)
+        mutated = operators.gaussian_mutation(self.genes, 1., 0, 1, 1., self.rng)
+        self.assertTrue((mutated != self.genes).all())
+        self.assertTrue(((toolboxes.mutate_array(self.genes * 10, 1., self.rng, mu=0, sigma=1, indpb=1.) <= 1)).all())
+
+    def test_tournament_compares_lexicographically(self):
+        wvalues = np.array([[1, 0], [3, 0], [3, 1], [2, 5]], dtype=float)
+        winners = operators.tournament(wvalues, 20, 50, self.rng)
+        np.testing.assert_array_equal(winners, [2] * 20)
+
+class TestVectorizedToolbox(TestCase):
+    def setUp(self):
+        random.seed(1)
+        self.toolbox = toolboxes.darwinian(toolboxes.sheep(10, vectorized=True))
+        self.population = self.toolbox.population()
+        for i, individual in enumerate(self.population):
+            individual.fitness.values = i, 0
+
+    def test_select_returns_references(self):
+        selected = self.toolbox.select(self.population)
+        self.assertEqual(len(selected), 10)
+        self.assertTrue(all(any(ind is other for other in self.population) for ind in selected))
+
+    def test_new_population(self):
+        offspring = self.toolbox.new_population(self.population)
+        self.assertEqual(len(offspring), 10)
+        self.assertTrue(all(type(ind) is creator.Sheep and len(ind) == 7 for ind in offspring))
+        self.assertTrue(all(0 <= gene <= 1 for ind in offspring for gene in ind))
+
+    def test_reproducible(self):
+        random.seed(3)
+        first = self.toolbox.new_population(self.population)
+        random.seed(3)
+        self.assertEqual(first, self.toolbox.new_population(self.population))
@@ -1,6 +1,9 @@
 import random
+import numpy as np
 from deap import base, tools, creator, algorithms
 
+from gen import operators
+
 from simulation.environment import Environment
 
 creator.create('FitnessMax', base.Fitness, weights=(1.,.1))
@@ -11,8 +14,7 @@ def bounded(low=0, high=1):
     def bounder(func):
         def wrapper(*args, **kwargs):
             res, = func(*args, **kwargs)
-            for i in range(len(res)):
-                res[i] = max(low, min(high, res[i]))
+            res[:] = np.clip(res, low, high).tolist()
             return res,
         return wrapper
     return bounder
@@ -22,25 +24,32 @@ def enclosed_in_tuple(func):
         return func(*args, **kwargs),
     return wrapper
 
-def common_toolbox():
+# vectorized toolboxes select and vary whole species as arrays
+def common_toolbox(vectorized=False, cxpb=0.5, mutpb=0.1):
     toolbox = base.Toolbox()
     toolbox.register('random', random.random)
     toolbox.register('mate', tools.cxTwoPoint)
-    toolbox.register('new_population', algorithms.varAnd, cxpb=0.5, mutpb=0.1, toolbox=toolbox)
+    if vectorized:
+        toolbox.register('new_population', operators.vary, cxpb=cxpb, mutpb=mutpb, toolbox=toolbox)
+    else:
+        toolbox.register('new_population', algorithms.varAnd, cxpb=cxpb, mutpb=mutpb, toolbox=toolbox)
     return toolbox
 
-def sheep(count):
-    toolbox = common_toolbox()
+def tournament(vectorized):
+    return operators.select_tournament if vectorized else tools.selTournament
+
+def sheep(count, vectorized=False, **kwargs):
+    toolbox = common_toolbox(vectorized, **kwargs)
     toolbox.register('individual', tools.initRepeat, creator.Sheep, toolbox.random, n=7)
     toolbox.register('population', tools.initRepeat, list, toolbox.individual, n=count)
-    toolbox.register('select', tools.selTournament, tournsize=3, k=count)
+    toolbox.register('select', tournament(vectorized), tournsize=3, k=count)
     return toolbox
 
-def wolves(count):
-    toolbox = common_toolbox()
+def wolves(count, vectorized=False, **kwargs):
+    toolbox = common_toolbox(vectorized, **kwargs)
     toolbox.register('individual', tools.initRepeat, creator.Wolf, toolbox.random, n=5)
     toolbox.register('population', tools.initRepeat, list, toolbox.individual, n=count)
-    toolbox.register('select', tools.selTournament, tournsize=3, k=count)
+    toolbox.register('select', tournament(vectorized), tournsize=3, k=count)
     # toolbox.register('select', tools.emo.identity) #, tournsize=3, k=count)
     return toolbox
 
@@ -51,6 +60,7 @@ def lamarckian(toolbox):
     toolbox.decorate('change_negative', bounded())
     toolbox.register('mutate', tools.emo.identity)
     toolbox.decorate('mutate', enclosed_in_tuple)
+    toolbox.register('mutate_array', operators.no_mutation)
     return toolbox
 
 def darwinian(toolbox):
@@ -58,8 +68,12 @@ def darwinian(toolbox):
     toolbox.register('change_negative', tools.emo.identity)
     toolbox.register('mutate', tools.mutGaussian, mu=0, sigma=1e-2, indpb=1e-1)
     toolbox.decorate('mutate', bounded())
+    toolbox.register('mutate_array', mutate_array, mu=0, sigma=1e-2, indpb=1e-1)
     return toolbox
 
+def mutate_array(genes, mutpb, rng, **kwargs):
+    return operators.clip(operators.gaussian_mutation(genes, mutpb, rng=rng, **kwargs))
+
 def distribute_call(member_foo, pop, *pop_arg):
     return [getattr(toolbox, member_foo)(*arg) for toolbox, *arg in zip(pop, *pop_arg)],
 
@@ -0,0 +1,56 @@
+import os
+import queue
+import threading
+
+
+# writes to a temporary file which replaces the target only once it is on disk
+def durable_write(path, write, mode='wb'):
+    tmp = path + '.tmp'
+    with open(tmp, mode) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+# Runs submitted writes one by one, in submission order, on a background
+# thread. The queue is bounded, so submit blocks when the disk falls behind.
+# A failed write stops the writer for good: writes queued behind it are
+# dropped and every later call raises the error, so no write is ever lost
+# in the middle of a sequence which later goes on.
+class BackgroundWriter:
+    def __init__(self, maxsize=4):
+        self.queue = queue.Queue(maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='BackgroundWriter', daemon=True)
+        self.thread.start()
+
+    def submit(self, foo, *args):
+        self._raise()
+        self.queue.put((foo, args))
+
+    def flush(self):
+        self.queue.join()
+        self._raise()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put((None, ()))
+            self.thread.join()
+        self._raise()
+
+    def _run(self):
+        while True:
+            foo, args = self.queue.get()
+            try:
+                if foo is None:
+                    return
+                if self.error is None:
+                    foo(*args)
+            except BaseException as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _raise(self):
+        if self.error is not None:
+            raise self.error
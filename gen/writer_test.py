@@ -0,0 +1,60 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from gen.writer import BackgroundWriter, durable_write
+
+class BackgroundWriterTest(TestCase):
+    def setUp(self):
+        self.writer = BackgroundWriter(maxsize=2)
+
+    def tearDown(self):
+        self.writer.close()
+
+    def test_keeps_order(self):
+        done = []
+        for i in range(10):
+            self.writer.submit(done.append, i)
+        self.writer.flush()
+        self.assertEqual(done, list(range(10)))
+
+    def test_queue_is_bounded(self):
+        release = threading.Event()
+        self.writer.submit(release.wait)
+        self.writer.submit(id, 1)
+        self.writer.submit(id, 2)
+        self.assertTrue(self.writer.queue.full())
+        release.set()
+        self.writer.flush()
+
+    def test_raises_errors_on_flush(self):
+        self.writer.submit(int, 'not a number')
+        with self.assertRaises(ValueError):
+            self.writer.flush()
+        self.writer = BackgroundWriter()
+
+    def test_errors_stop_later_writes(self):
+        done, release = [], threading.Event()
+        self.writer.submit(release.wait)
+        self.writer.submit(int, 'not a number')
+        self.writer.submit(done.append, 1)
+        release.set()
+        with self.assertRaises(ValueError):
+            self.writer.flush()
+        with self.assertRaises(ValueError):
+            self.writer.submit(done.append, 2)
+        with self.assertRaises(ValueError):
+            self.writer.close()
+        self.assertEqual(done, [])
+        self.writer = BackgroundWriter()
+
+class DurableWriteTest(TestCase):
+    def test_replaces_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'file.txt')
+            durable_write(path, lambda f: f.write('first'), mode='w')
+            durable_write(path, lambda f: f.write('second'), mode='w')
+            with open(path) as f:
+                self.assertEqual(f.read(), 'second')
+            self.assertEqual(os.listdir(tmp), ['file.txt'])
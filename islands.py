@@ -0,0 +1,165 @@
+import os
+import contextlib
+import traceback
+import datetime
+import multiprocessing
+
+import numpy as np
+from deap import creator
+
+from experiment import Experiment
+import gen.toolboxes # required to register necesary types
+
+
+def ring(islands):
+    return [(i, (i + 1) % islands) for i in range(islands) if islands > 1]
+
+def fully_connected(islands):
+    return [(i, j) for i in range(islands) for j in range(islands) if i != j]
+
+TOPOLOGIES = {
+    'ring': ring,
+    'full': fully_connected,
+}
+
+def pack(individuals):
+    if not individuals:
+        return np.zeros((0, 0)), np.zeros((0, 2))
+    genes = np.array(individuals, dtype=float).reshape(len(individuals), -1)
+    fitness = np.array([ind.fitness.values for ind in individuals], dtype=float).reshape(-1, 2)
+    return genes, fitness
+
+def unpack(arrays, like):
+    genes, fitness = arrays
+    individuals = []
+    for ind_genes, ind_fitness in zip(genes, fitness):
+        individual = type(like)(ind_genes.tolist())
+        individual.fitness.values = tuple(ind_fitness.tolist())
+        individuals.append(individual)
+    return individuals
+
+def weighted(fitness):
+    return fitness * np.array(creator.FitnessMax.weights)
+
+def best_index(fitness):
+    wvalues = weighted(fitness)
+    return np.lexsort(wvalues.T[::-1])[-1]
+
+# island process, driven by commands sent over the pipe. Every reply is
+# ('ok', result), or ('error', traceback) once the island has failed.
+def island(toolbox_factory, checkpoint, epochs, migrants, options, conn):
+    try:
+        with Experiment(toolbox_factory(), epochs, checkpoint, **options) as experiment:
+            while True:
+                command, arg = conn.recv()
+                if command == 'run':
+                    experiment.run(arg)
+                    conn.send(('ok', [pack(best) for best in experiment.best(migrants)]))
+                elif command == 'immigrate':
+                    experiment.immigrate([unpack(arrays, population[0]) if population else []
+                                          for arrays, population in zip(arg, experiment.population)])
+                    conn.send(('ok', None))
+                elif command == 'stop':
+                    conn.send(('ok', [pack(best) for best in experiment.best(1)]))
+                    return
+    except BaseException:
+        with contextlib.suppress(OSError):
+            conn.send(('error', traceback.format_exc()))
+
+# Evolves an independent Experiment on every island and every
+# migration_interval generations sends the best individuals of each specie
+# along the edges of the topology.
+class Archipelago:
+    def __init__(self, toolbox_factory, islands=4, epochs=50, migration_interval=5, migrants=2,
+                 topology='ring', checkpoint=None, seed=None, **options):
+        if checkpoint is None:
+            checkpoint = os.path.join('checkpoints', str(datetime.datetime.now().strftime('%Y_%m_%d_%H_%M_%S')))
+
+        self.epochs = epochs
+        self.migration_interval = migration_interval
+        # seconds between checks that a silent island is still alive
+        self.poll_interval = 1.
+        self.edges = TOPOLOGIES[topology](islands)
+        self.connections = []
+        self.processes = []
+        seeds = np.random.SeedSequence(seed).spawn(islands)
+        for i in range(islands):
+            conn, island_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=island,
+                                              args=(toolbox_factory, os.path.join(checkpoint, 'island_%d' % i),
+                                                    epochs, migrants, dict(options, seed=seeds[i]), island_conn))
+            process.start()
+            # only the island holds its end, so the pipe closes when it dies
+            island_conn.close()
+            self.connections.append(conn)
+            self.processes.append(process)
+
+    def run(self):
+        for epoch in range(0, self.epochs, self.migration_interval):
+            best = self.broadcast('run', self.migration_interval)
+            if epoch + self.migration_interval < self.epochs:
+                self.migrate(best)
+        return self.stop()
+
+    def migrate(self, best):
+        incoming = [[] for _ in self.connections]
+        for source, target in self.edges:
+            incoming[target].append(best[source])
+        for i, migrants in enumerate(incoming):
+            self.send(i, ('immigrate', [tuple(np.concatenate(arrays) for arrays in zip(*specie))
+                                        for specie in zip(*migrants)] if migrants else []))
+        for i in range(len(self.connections)):
+            self.receive(i)
+
+    def broadcast(self, command, arg=None):
+        for i in range(len(self.connections)):
+            self.send(i, (command, arg))
+        return [self.receive(i) for i in range(len(self.connections))]
+
+    # the pipe of a dead island is closed, receive tells why it died
+    def send(self, i, message):
+        try:
+            self.connections[i].send(message)
+        except OSError:
+            self.receive(i)
+            raise
+
+    # Reply of an island. A failed or dead island stops the archipelago
+    # instead of leaving the driver waiting for it forever.
+    def receive(self, i):
+        conn, process = self.connections[i], self.processes[i]
+        try:
+            while not conn.poll(self.poll_interval):
+                if not process.is_alive() and not conn.poll():
+                    raise EOFError
+            status, result = conn.recv()
+        except (EOFError, OSError):
+            self.terminate()
+            raise RuntimeError('island %d exited with code %s' % (i, process.exitcode))
+        if status == 'error':
+            self.terminate()
+            raise RuntimeError('island %d failed:\n%s' % (i, result))
+        return result
+
+    def terminate(self):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+    # global best (genes, fitness) of each specie over all islands
+    def stop(self):
+        best = self.broadcast('stop')
+        for process in self.processes:
+            process.join()
+
+        results = []
+        for specie in zip(*best):
+            genes = np.concatenate([arrays[0] for arrays in specie])
+            fitness = np.concatenate([arrays[1] for arrays in specie])
+            if len(fitness):
+                i = best_index(fitness)
+                results.append((genes[i], fitness[i]))
+            else:
+                results.append(None)
+        return results
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+import islands
+import gen.toolboxes as tbx
+
+
+def small_toolbox():
+    return tbx.environment(tbx.darwinian(tbx.sheep(count=4)), tbx.lamarckian(tbx.wolves(count=2)))
+
+def failing_toolbox():
+    raise ValueError('broken toolbox')
+
+class TopologyTest(TestCase):
+    def test_ring(self):
+        self.assertEqual(islands.ring(3), [(0, 1), (1, 2), (2, 0)])
+        self.assertEqual(islands.ring(1), [])
+
+    def test_fully_connected(self):
+        self.assertEqual(len(islands.fully_connected(4)), 12)
+
+class ArchipelagoTest(TestCase):
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as checkpoint:
+            archipelago = islands.Archipelago(small_toolbox, islands=2, epochs=2, migration_interval=1,
+                                              migrants=1, topology='full', checkpoint=checkpoint, steps=2)
+            (sheep_genes, sheep_fitness), (wolf_genes, wolf_fitness) = archipelago.run()
+
+            self.assertEqual(sheep_genes.shape, (7,))
+            self.assertEqual(wolf_genes.shape, (5,))
+            self.assertEqual(sorted(os.listdir(checkpoint)), ['island_0', 'island_1'])
+
+    def test_failed_island_raises(self):
+        with tempfile.TemporaryDirectory() as checkpoint:
+            archipelago = islands.Archipelago(failing_toolbox, islands=2, epochs=2, checkpoint=checkpoint)
+            with self.assertRaisesRegex(RuntimeError, 'broken toolbox'):
+                archipelago.run()
+            self.assertFalse(any(process.is_alive() for process in archipelago.processes))
+
+    def test_dead_island_raises(self):
+        with tempfile.TemporaryDirectory() as checkpoint:
+            archipelago = islands.Archipelago(small_toolbox, islands=2, epochs=2, checkpoint=checkpoint, steps=2)
+            archipelago.poll_interval = .05
+            archipelago.processes[1].kill()
+            with self.assertRaisesRegex(RuntimeError, 'island 1 exited'):
+                archipelago.run()
+            self.assertFalse(any(process.is_alive() for process in archipelago.processes))
+
+    def test_best_index(self):
+        fitness = np.array([[1, 10], [2, 0], [2, 5], [0, 100]])
+        self.assertEqual(islands.best_index(fitness), 2)
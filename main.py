@@ -1,9 +1,12 @@
 from experiment import Experiment
 import gen.toolboxes as t
+from simulation.progress import StreamProgress
+
+def toolbox():
+    return t.environment(t.darwinian(t.sheep(count=100)), t.lamarckian(t.wolves(count=30)))
 
 def main():
-    toolbox = t.environment(t.darwinian(t.sheep(count=100)), t.lamarckian(t.wolves(count=30)))
-    experiment = Experiment(toolbox)
+    experiment = Experiment(toolbox(), progress=StreamProgress())
     experiment.run()
 
 if __name__ == '__main__':
@@ -1,5 +1,7 @@
 import numpy as np
-import random
+
+from simulation.store import StoredView, column, gene_columns
+from simulation.profiling import profiled
 
 EPSILON = 1e-16
 
@@ -13,6 +15,14 @@ SHEEP_EAT_ENERGY = 10
 WOLF_EAT_ENERGY  = 400
 INERTIA = 0.3
 
+GRASS, SHEEP, WOLF = range(3)
+
+# index of the choice picked by a uniform draw from [0, 1) given cumulative
+# weights along the last axis, shared by both engines to pick the same decisions
+def pick(cumulative, draw):
+    hits = (cumulative <= np.asarray(draw)[..., None] * cumulative[..., -1:]).sum(axis=-1)
+    return np.minimum(hits, cumulative.shape[-1] - 1)
+
 def unit_vector(v):
     return v / (np.linalg.norm(v) + EPSILON)
 
@@ -22,70 +32,53 @@ def limit(val, low=0, high=1000):
 def score_agent_hunger(agent):
     return limit((agent.MAX_ENERGY - agent.energy) * agent.hunger_a + agent.hunger_b)
 
-def filter_by_type(population, agentType):
-    return (agent for agent in population if type(agent) is agentType)
-
-def first_pos(agent, population):
-    try:
-        return next(iter(population)).pos
-    except StopIteration:
-        return agent.pos + [agent.VIEW_RANGE, 0]
+# heading towards the nearest of the neighbours, straight ahead if there is none
+def nearest_heading(agent, neighbours):
+    return neighbours.headings[0] if len(neighbours) else np.array([agent.VIEW_RANGE, 0.])
 
 def avoidance_score(agent, neighbours):
-    closest = first_pos(agent, neighbours)
-    distance_to_closest = agent.space.get_distance(agent.pos, closest)
+    distance_to_closest = neighbours.distances[0] if len(neighbours) else agent.VIEW_RANGE
     return 1 - (distance_to_closest / agent.VIEW_RANGE)
 
-def avoid(neighbour_heading, radius):
-    length = np.linalg.norm(neighbour_heading)
+def avoid(neighbour_heading, radius, distances=None):
+    if distances is None:
+        length = np.linalg.norm(neighbour_heading, axis=-1, keepdims=True)
+    else:
+        length = np.asarray(distances)[..., None]
     return -neighbour_heading * (radius - length) / (length + EPSILON)
 
+# Boids rules over (M, 2) arrays: headings towards the M neighbours, the
+# distances to them and the neighbours' own headings. Every rule is a
+# single pass over the arrays.
+def in_view(headings, own, fov=np.pi/2):
+    cross = headings[..., 0] * own[..., 1] - headings[..., 1] * own[..., 0]
+    dot = headings[..., 0] * own[..., 0] + headings[..., 1] * own[..., 1]
+    return np.arctan2(np.abs(cross), dot) < fov
+
+def cohesion(headings):
+    return unit_vector(headings.sum(axis=0))
+
+def alignment(neighbour_headings):
+    return unit_vector(neighbour_headings.mean(axis=0))
+
+def separation(headings, distances, radius):
+    close = distances <= radius / 2
+    return avoid(headings[close], radius, distances[close]).sum(axis=0)
+
+def flock(headings, distances, neighbour_headings, own, radius):
+    visible = in_view(headings, own)
+    if not visible.any():
+        return np.zeros(2)
+    headings, distances = headings[visible], distances[visible]
+    return (cohesion(headings) + separation(headings, distances, radius)
+            + alignment(neighbour_headings[visible]))
+
 def escape(agent, neighbours):
-    return sum((avoid(agent.space.get_heading(agent.pos, neighbour.pos),
-                      agent.VIEW_RANGE)
-                for neighbour in neighbours),
-               np.array([0, 0]))
-
-def cohere(agent, neighbours):
-    return unit_vector(sum((agent.space.get_heading(agent.pos, neighbour.pos)
-                           for neighbour in neighbours)))
-
-def align(agent, neighbours):
-    mass_centre = np.mean(np.array([neighbour.heading
-                                    for neighbour in neighbours]), axis=0)
-    return unit_vector(mass_centre)
-
-def angle(V1, V2):
-    cosang = np.dot(V1, V2)
-    sinang = np.linalg.norm(np.cross(V1, V2))
-    return np.arctan2(sinang, cosang)
-
-def couple(agent, population):
-    population = list(visible
-                      for visible in population
-                      if  angle(agent.space.get_heading(agent.pos, visible.pos),
-                                agent.heading)
-                          < np.pi/2)
-    if not population:
-        return np.array([0, 0])
-
-    cohersion  = cohere(agent, population)
-    alignment  = align(agent, population)
-    separation = escape(agent, (neighbour
-                                for neighbour in population
-                                if agent.space.get_distance(agent.pos, neighbour.pos) <= agent.VIEW_RANGE / 2))
-    return cohersion + separation + alignment
-
-class Grass:
-    RADIUS = GRASS_RADIUS
-    COLOR = 'green'
-    energy = 0
+    return avoid(neighbours.headings, agent.VIEW_RANGE, neighbours.distances).sum(axis=0)
 
-    def step(self):
-        pass
-    
-    def advance(self):
-        pass
+def couple(agent, neighbours):
+    return flock(neighbours.headings, neighbours.distances, neighbours.column('heading'),
+                 agent.heading, agent.VIEW_RANGE)
 
 class Decision:
     def __init__(self, pos, extra_speed=0):
@@ -101,29 +94,44 @@ class Decision:
         agent.heading = unit_vector(agent.heading)
         agent.new_pos = agent.space.torus_adj(agent.pos + agent.heading * self.speed)
 
-class Agent:
+class Agent(StoredView):
+    __slots__ = ('space', 'decision', '_idx')
     VIEW_RANGE = VIEW_RANGE
     MAX_ENERGY = MAX_ENERGY
     RADIUS = None
+    FOOD = None
+
+    heading = column('heading')
+    new_pos = column('new_pos')
+    energy  = column('energy')
+    eaten   = column('eaten')
+    draw    = column('draw')
+    cost    = column('cost')
+    survived = column('survived')
 
     def __init__(self, space):
+        super(Agent, self).__init__(space.store)
         self.space = space
         self.energy = self.MAX_ENERGY
-        self.pos = None
-        self.heading = np.zeros(2)
-        self.new_pos = np.zeros(2)
-        
+
+    @profiled('agent.step')
     def step(self):
-        neighbours = list(self.space.get_neighbors(self, self.VIEW_RANGE, include_center=False))
+        neighbours = self.space.neighbours(self, self.VIEW_RANGE)
         self.decision = self.make_deicision(neighbours)
     
+    @profiled('agent.advance')
     def advance(self):
         self.decision.apply(self)
+        self.resolve(self.decision.cost)
+
+    @profiled('agent.resolve')
+    def resolve(self, cost):
         coliding = self._get_coliding()
 
         if self.valid_decision(coliding):
             self.move()
-        self.energy -= self.decision.cost
+        self.cost = cost
+        self.energy -= cost
         if self.energy < self.MAX_ENERGY:
             self.find_food(coliding)
         self.penalty(coliding)
@@ -131,32 +139,37 @@ class Agent:
             self.space._remove_agent(self.pos, self)
 
     def _get_coliding(self):
-        movement = self.space.get_distance(self.new_pos, self.pos)
-        neighbours = self.space.get_neighbors(self, self.RADIUS + movement, include_center=False)
-        # neighbours = list(neighbours)
-        # print(len(neighbours), movement, self.heading)
-        return [neighbour 
-                for neighbour in neighbours
-                if self.space.get_distance(self.new_pos, neighbour.pos) <= self.RADIUS]
+        collisions = self.space.collisions
+        if collisions is not None and self in collisions:
+            return collisions.of(self)
+        return self.space.neighbours(self, self.RADIUS, point=self.new_pos)
+
+    # grass patches under new_pos which have not been eaten yet
+    def _get_grass(self):
+        collisions, grass = self.space.collisions, self.space.grass
+        if collisions is not None and self in collisions:
+            patches = collisions.grass_of(self)
+            return patches[grass.available[patches]]
+        return grass.colliding(self.new_pos, self.RADIUS)
 
     def move(self):
         self.space.move_agent(self, self.new_pos)
     
     def valid_decision(self, coliding):
-        try:
-            next(filter_by_type(coliding, type(self)))
-            return False
-        except:
-            return True
+        return not len(coliding.of_type(type(self)))
 
     def make_deicision(self, neighbours):
         decisions, weights = self.get_weighted_decisions(neighbours)
-        decision = random.choices(decisions, np.array(weights).round(8) + EPSILON)[0](neighbours)
-        return decision
+        cumulative = np.cumsum(np.array(weights).round(8) + EPSILON)
+        return decisions[pick(cumulative, self.draw)](neighbours)
     
     def find_food(self, coliding):
         pass
 
+    def die(self):
+        self.energy = 0
+        self.space._remove_agent(self.pos, self)
+
     def penalty(self, coliding):
         pass
 
@@ -164,13 +177,19 @@ class Agent:
         pass
 
 class SheepAgent(Agent):
+    __slots__ = ()
+    SPECIES = SHEEP
     RADIUS = SHEEP_RADIUS
+    FOOD = GRASS
     COLOR = 'blue'
 
+    (  hunger_a,   hunger_b,
+         fear_a,     fear_b, fear_speed,
+     coupling_a, coupling_b             ) = gene_columns(7)
+
     def __init__(self, genes, space):
         super(SheepAgent, self).__init__(space)
         self.apply_genes(genes)
-        self.eaten = 0
 
     def apply_genes(self, genes):
         (  self.hunger_a,   self.hunger_b,
@@ -183,14 +202,13 @@ class SheepAgent(Agent):
                 self.coupling_a, self.coupling_b                 )
 
     def hunger(self, neighbours):
-        food = filter_by_type(neighbours, Grass)
-        closest = first_pos(self, food)
-        return Decision(self.space.get_heading(self.pos, closest))
+        found, headings = self.space.grass.nearest(self.pos, self.VIEW_RANGE)
+        return Decision(headings[0] if found[0] >= 0 else np.array([self.VIEW_RANGE, 0.]))
 
     def coupling(self, neighbours):
-        sheep = filter_by_type(neighbours, SheepAgent)
-        return Decision(couple(self, sheep))
+        return Decision(couple(self, neighbours.of_type(SheepAgent)))
 
+    # grass is not part of the space, so only agents are fled from
     def fear(self, neighbours):
         return Decision(escape(self, neighbours), self.fear_speed)
 
@@ -198,30 +216,39 @@ class SheepAgent(Agent):
         return score_agent_hunger(self)
 
     def score_coupling(self, neighbours):
-        sheep = filter_by_type(neighbours, SheepAgent)
-        return avoidance_score(self, sheep)
+        return avoidance_score(self, neighbours.of_type(SheepAgent))
 
     def score_fear(self, neighbours):
-        wolves = filter_by_type(neighbours, WolfAgent)
-        return avoidance_score(self, wolves)
+        return avoidance_score(self, neighbours.of_type(WolfAgent))
 
     def get_weighted_decisions(self, ns):
         return ([self.hunger,         self.coupling,           self.fear],
                 [self.score_hunger(), self.score_coupling(ns), self.score_fear(ns)])
 
+    # grass without regrowth is never used up, so it is never claimed
     def find_food(self, coliding):
-        if filter_by_type(coliding, Grass):
+        grass = self.space.grass
+        for patch in self._get_grass():
+            if grass.regrowth is not None and not self.space.claim((GRASS, patch)):
+                continue
+            self.space.defer(grass.eat, [patch])
             self.energy += SHEEP_EAT_ENERGY
             self.eaten  += 1
+            return
 
 class WolfAgent(Agent):
+    __slots__ = ()
+    SPECIES = WOLF
     RADIUS = WOLF_RADIUS
+    FOOD = SHEEP
     COLOR = 'red'
 
+    (  hunger_a,   hunger_b, hunger_speed,
+     coupling_a, coupling_b               ) = gene_columns(5)
+
     def __init__(self, genes, space):
         super(WolfAgent, self).__init__(space)
         self.apply_genes(genes)
-        self.eaten = 0
 
     def apply_genes(self, genes):
         (  self.hunger_a,   self.hunger_b, self.hunger_speed,
@@ -232,27 +259,26 @@ class WolfAgent(Agent):
                 self.coupling_a, self.coupling_b                   )
 
     def hunger(self, neighbours):
-        food = filter_by_type(neighbours, SheepAgent)
-        closest = first_pos(self, food)
-        return Decision(self.space.get_heading(self.pos, closest), self.hunger_speed)
+        food = neighbours.of_type(SheepAgent)
+        return Decision(nearest_heading(self, food), self.hunger_speed)
 
     def coupling(self, neighbours):
-        wolves = filter_by_type(neighbours, WolfAgent)
-        return Decision(couple(self, wolves))
+        return Decision(couple(self, neighbours.of_type(WolfAgent)))
 
     def score_hunger(self):
         return score_agent_hunger(self)
 
     def score_coupling(self, neighbours):
-        wolves = filter_by_type(neighbours, WolfAgent)
-        return avoidance_score(self, wolves)
+        return avoidance_score(self, neighbours.of_type(WolfAgent))
 
     def get_weighted_decisions(self, ns):
         return ([self.hunger,         self.coupling],
                 [self.score_hunger(), self.score_coupling(ns)])
 
     def find_food(self, coliding):
-        for sheep in filter_by_type(coliding, SheepAgent):
-            self.energy, sheep.energy = self.energy + WOLF_EAT_ENERGY, 0
+        for sheep in coliding.of_type(SheepAgent):
+            if not self.space.claim((SHEEP, sheep._idx)):
+                continue
+            self.energy += WOLF_EAT_ENERGY
             self.eaten  += 1
-            self.space._remove_agent(sheep.pos, sheep)
+            self.space.defer(sheep.die)
@@ -0,0 +1,73 @@
+from unittest import TestCase
+import numpy as np
+
+from simulation import boids, space
+
+
+def angle(v1, v2):
+    return np.arctan2(abs(v1[0] * v2[1] - v1[1] * v2[0]), np.dot(v1, v2))
+
+# the per-neighbour rules the vectorized ones replace
+def reference_flock(headings, neighbour_headings, own, radius):
+    visible = [i for i, heading in enumerate(headings) if angle(heading, own) < np.pi/2]
+    if not visible:
+        return np.zeros(2)
+    cohesion = boids.unit_vector(sum(headings[i] for i in visible))
+    alignment = boids.unit_vector(np.mean([neighbour_headings[i] for i in visible], axis=0))
+    separation = np.zeros(2)
+    for i in visible:
+        length = np.linalg.norm(headings[i])
+        if length <= radius / 2:
+            separation += -headings[i] * (radius - length) / (length + boids.EPSILON)
+    return cohesion + separation + alignment
+
+class FlockTest(TestCase):
+    def setUp(self):
+        np.random.seed(42)
+        self.headings = (np.random.rand(60, 2) - .5) * .2
+        self.distances = np.linalg.norm(self.headings, axis=1)
+        self.neighbour_headings = np.random.rand(60, 2) - .5
+        self.own = np.array([.6, .8])
+
+    def test_matches_reference(self):
+        np.testing.assert_array_almost_equal(
+            boids.flock(self.headings, self.distances, self.neighbour_headings, self.own, boids.VIEW_RANGE),
+            reference_flock(self.headings, self.neighbour_headings, self.own, boids.VIEW_RANGE))
+
+    def test_in_view(self):
+        expected = [angle(heading, self.own) < np.pi/2 for heading in self.headings]
+        np.testing.assert_array_equal(boids.in_view(self.headings, self.own), expected)
+        np.testing.assert_array_equal(boids.in_view(self.headings, np.tile(self.own, (60, 1))), expected)
+
+    def test_nothing_in_view(self):
+        np.testing.assert_array_equal(
+            boids.flock(-self.own[None] * .01, np.array([.01]), self.neighbour_headings[:1], self.own, .1),
+            [0, 0])
+
+    def test_avoid_with_distances(self):
+        np.testing.assert_array_almost_equal(boids.avoid(self.headings, .1, self.distances),
+                                             boids.avoid(self.headings, .1))
+
+class WolfFeedingTest(TestCase):
+    # a sheep under two wolves is only gone once the batch is committed
+    def test_sheep_is_eaten_once_per_batch(self):
+        for detect in False, True:
+            cached = space.CachedSpace()
+            sheep = boids.SheepAgent(np.zeros(7), cached)
+            pack = [boids.WolfAgent(np.zeros(5), cached) for _ in range(2)]
+            for agent, pos in zip([sheep] + pack, ([.5, .5], [.51, .5], [.49, .5])):
+                cached.place_agent(agent, np.array(pos))
+                agent.new_pos = np.array(pos)
+            for wolf in pack:
+                wolf.energy = 100
+            cached.begin_batch()
+            if detect:
+                cached.detect_collisions(pack)
+            for wolf in pack:
+                wolf.find_food(wolf._get_coliding())
+            cached.commit_batch()
+            with self.subTest(detect=detect):
+                self.assertEqual([wolf.eaten for wolf in pack], [1, 0])
+                self.assertEqual([wolf.energy for wolf in pack], [100 + boids.WOLF_EAT_ENERGY, 100])
+                self.assertEqual(sheep.energy, 0)
+                self.assertFalse(cached.not_removed[sheep._idx])
@@ -0,0 +1,56 @@
+import numpy as np
+
+from simulation.index import GridIndex, minimum_image
+
+
+# All overlaps of a set of moving agents in one pass, for steps in which the
+# space does not change (see CachedSpace.begin_batch). The broad phase hashes
+# the agents into cells as large as the largest collision radius, the narrow
+# phase keeps pairs closer than the radius of the mover. Pairs are kept per
+# mover, nearest first, for agents and grass patches separately.
+class Collisions:
+    def __init__(self, space, idxs, points, radii):
+        self.space = space
+        self._slots = np.full(len(space.agents), -1)
+        self._slots[idxs] = np.arange(len(idxs))
+
+        reach = radii.max() if len(radii) else 0
+        grid = GridIndex(cell_size=max(reach, 1e-3))
+        grid.build(space._index.pos)
+        movers, second = grid.pairs(reach, points)
+        keep = space.not_removed[second] & (second != idxs[movers])
+        self.movers, self.second, self.distances, self.headings = self._narrow(
+            movers[keep], second[keep], space._index.pos, points, radii)
+        self._starts = self._csr(self.movers, len(idxs))
+
+        grass = space.grass
+        movers, patches = grass.index.pairs(reach, points)
+        self.grass_movers, self.patches, _, _ = self._narrow(movers, patches, grass.pos, points, radii)
+        self._grass_starts = self._csr(self.grass_movers, len(idxs))
+
+    @staticmethod
+    def _narrow(movers, second, pos, points, radii):
+        headings = minimum_image(pos[second] - points[movers])
+        distances = np.linalg.norm(headings, axis=-1)
+        inside = distances <= radii[movers]
+        movers, second, distances, headings = movers[inside], second[inside], distances[inside], headings[inside]
+        order = np.lexsort((distances, movers))
+        return movers[order], second[order], distances[order], headings[order]
+
+    @staticmethod
+    def _csr(movers, count):
+        return np.concatenate(([0], np.cumsum(np.bincount(movers, minlength=count))))
+
+    def __contains__(self, agent):
+        return self._slots[agent._idx] >= 0
+
+    # agents overlapping the agent, as a result of CachedSpace.neighbours
+    def of(self, agent):
+        slot = self._slots[agent._idx]
+        found = slice(self._starts[slot], self._starts[slot + 1])
+        return self.space.neighbours_result(self.second[found], self.distances[found], self.headings[found])
+
+    # grass patches overlapping the agent, available or not
+    def grass_of(self, agent):
+        slot = self._slots[agent._idx]
+        return self.patches[self._grass_starts[slot]:self._grass_starts[slot + 1]]
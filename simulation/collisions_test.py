@@ -0,0 +1,59 @@
+from unittest import TestCase, mock
+import random
+
+import numpy as np
+
+import simulation.environment as env
+from simulation.index import minimum_image
+
+import gen.toolboxes as tbx
+
+
+def model(engine='object'):
+    random.seed(7)
+    np.random.seed(7)
+    species = tbx.sheep(60).population(), tbx.wolves(20).population()
+    return env.Environment(20, deferred=True, engine=engine).prepare_model(species, 42)
+
+class CollisionsTest(TestCase):
+    def setUp(self):
+        self.model = model()
+        self.model.step()
+        self.space = self.model.space
+        self.agents = list(self.model.schedule.agents)
+        for agent in self.agents:
+            agent.new_pos = (agent.pos + (np.random.rand(2) - .5) * .02) % 1
+        self.space.begin_batch()
+        self.space.detect_collisions(self.agents)
+
+    def test_matches_brute_force(self):
+        pos = self.space._index.pos
+        for agent in self.agents:
+            distances = np.linalg.norm(minimum_image(pos - agent.new_pos), axis=1)
+            expected = [self.space.agents[i] for i in np.argsort(distances, kind='stable')
+                        if distances[i] <= agent.RADIUS and i != agent._idx and self.space.not_removed[i]]
+            self.assertEqual(list(self.space.collisions.of(agent)), expected)
+
+    def test_grass(self):
+        grass = self.space.grass
+        for agent in self.agents:
+            distances = np.linalg.norm(minimum_image(grass.pos - agent.new_pos), axis=1)
+            np.testing.assert_array_equal(np.sort(self.space.collisions.grass_of(agent)),
+                                          np.nonzero(distances <= agent.RADIUS)[0])
+
+    def test_cleared_by_commit(self):
+        self.space.commit_batch()
+        self.assertIsNone(self.space.collisions)
+
+class BatchedAdvanceTest(TestCase):
+    def run_model(self, engine, batched):
+        m = model(engine)
+        m.space.grass.regrowth = 5
+        if not batched:
+            m.space.detect_collisions = mock.MagicMock()
+        m.run_model()
+        return [(agent.eaten, agent.energy) for agent in m.population]
+
+    def test_same_results_as_per_agent_queries(self):
+        for engine in ('object', 'vectorized'):
+            self.assertEqual(self.run_model(engine, True), self.run_model(engine, False))
@@ -0,0 +1,183 @@
+import numpy as np
+
+from simulation.profiling import profiled
+from simulation.boids import (SHEEP, WOLF, EPSILON, MAX_ENERGY, VIEW_RANGE,
+                              BASE_SPEED, INERTIA, pick, avoid, in_view)
+
+
+HUNGER, COUPLING, FEAR = range(3)
+
+def unit_vectors(v):
+    return v / (np.linalg.norm(v, axis=-1, keepdims=True) + EPSILON)
+
+def segment_sum(segments, values, n):
+    return np.stack([np.bincount(segments, weights=values[:, k], minlength=n)
+                     for k in range(values.shape[1])], axis=1)
+
+# first (so nearest) pair of every agent among masked pairs
+def first_neighbour(first, second, mask, n):
+    found = np.full(n, -1)
+    agents, at = np.unique(first[mask], return_index=True)
+    found[agents] = second[mask][at]
+    return found
+
+class ObjectEngine:
+    def __init__(self, model):
+        self.model = model
+
+    # while the space is frozen by a batch, all decisions are applied first
+    # so collisions of the whole step are found in one pass
+    def step(self):
+        schedule, space = self.model.schedule, self.model.space
+        if space._batch is None:
+            schedule.step()
+            return
+        schedule.do_each('step')
+        agents = list(schedule.agents)
+        for agent in agents:
+            agent.decision.apply(agent)
+        space.detect_collisions(agents)
+        for agent in agents:
+            agent.resolve(agent.decision.cost)
+        schedule.steps += 1
+        schedule.time += 1
+
+# Makes the decisions of the whole population at once, reproducing
+# Agent.step and Decision.apply of the boids model on the store columns.
+class VectorizedEngine:
+    def __init__(self, model):
+        self.model = model
+        self.space = model.space
+
+    def step(self):
+        idxs, costs = self.decide()
+        agents = [self.space.agents[idx] for idx in idxs]
+        if self.space._batch is not None:
+            self.space.detect_collisions(agents)
+        for agent, cost in zip(agents, costs):
+            agent.resolve(cost)
+
+    @profiled('engine.decide')
+    def decide(self):
+        state = self.state()
+        weights = self.weights(state)
+        targets, extra_speed = self.targets(state)
+
+        n = len(state['actors'])
+        choice = pick(np.cumsum(weights, axis=1), state['draw'][state['actors']])
+        chosen = np.arange(n)
+        self.apply(state, targets[chosen, choice], extra_speed[chosen, choice])
+        return state['actors'], 1 + 2 * extra_speed[chosen, choice]
+
+    def state(self):
+        space, store = self.space, self.space.store
+        space._update()
+        rows = space._row_array
+        species = store.species[rows]
+        alive = space.not_removed.copy()
+        first, second = space.get_pairs(VIEW_RANGE)
+        actor = alive[first]
+        first, second = first[actor], second[actor]
+        pos = store.pos[rows]
+        headings = space.get_headings(pos[first], pos[second])
+        distances = np.linalg.norm(headings, axis=1)
+        # neighbours of every agent nearest first, as in CachedSpace.neighbours
+        order = np.lexsort((distances, first))
+        first, second, headings, distances = first[order], second[order], headings[order], distances[order]
+        return {
+            'actors':    np.nonzero(alive)[0],
+            'rows':      rows,
+            'species':   species,
+            'pos':       pos,
+            'heading':   store.heading[rows],
+            'energy':    store.energy[rows],
+            'draw':      store.draw[rows],
+            'genes':     store.genes[rows],
+            'first':     first,
+            'second':    second,
+            'headings':  headings,
+            'distances': distances,
+        }
+
+    def weights(self, s):
+        actors, species, genes = s['actors'], s['species'], s['genes']
+        first, second = s['first'], s['second']
+
+        hunger = np.clip((MAX_ENERGY - s['energy']) * genes[:, 0] + genes[:, 1], 0, 1000)
+        coupling = self.avoidance(s, species[second] == species[first])
+        fear = self.avoidance(s, species[second] == WOLF)
+
+        weights = np.stack([hunger, coupling, fear], axis=1)[actors].round(8) + EPSILON
+        weights[species[actors] == WOLF, FEAR] = 0
+        return weights
+
+    def avoidance(self, s, mask):
+        n = len(s['species'])
+        distance = np.full(n, VIEW_RANGE)
+        closest = first_neighbour(s['first'], np.arange(len(s['first'])), mask, n)
+        found = closest >= 0
+        distance[found] = s['distances'][closest[found]]
+        return 1 - distance / VIEW_RANGE
+
+    def targets(self, s):
+        n, actors = len(s['species']), s['actors']
+        species, genes = s['species'], s['genes']
+        first, second = s['first'], s['second']
+        targets = np.zeros((n, 3, 2))
+        extra_speed = np.zeros((n, 3))
+
+        targets[:, HUNGER] = [VIEW_RANGE, 0]
+        prey = (species[first] == WOLF) & (species[second] == SHEEP)
+        closest = first_neighbour(first, np.arange(len(first)), prey, n)
+        found = closest >= 0
+        targets[found, HUNGER] = s['headings'][closest[found]]
+        sheep, = np.nonzero(species == SHEEP)
+        grass, headings = self.space.grass.nearest(s['pos'][sheep], VIEW_RANGE)
+        targets[sheep[grass >= 0], HUNGER] = headings[grass >= 0]
+        extra_speed[species == WOLF, HUNGER] = genes[species == WOLF, 2]
+
+        targets[:, COUPLING] = self.couple(s)
+
+        targets[:, FEAR] = segment_sum(first, self.avoid(s['headings'], s['distances']), n)
+        extra_speed[species == SHEEP, FEAR] = genes[species == SHEEP, 4]
+
+        return targets[actors], extra_speed[actors]
+
+    def couple(self, s):
+        n = len(s['species'])
+        first, second = s['first'], s['second']
+        headings, distances = s['headings'], s['distances']
+        visible = (s['species'][second] == s['species'][first]) & in_view(headings, s['heading'][first])
+        first, second = first[visible], second[visible]
+        headings, distances = headings[visible], distances[visible]
+
+        count = np.bincount(first, minlength=n)
+        cohesion = unit_vectors(segment_sum(first, headings, n))
+        alignment = unit_vectors(segment_sum(first, s['heading'][second], n) / np.maximum(count, 1)[:, None])
+        close = distances <= VIEW_RANGE / 2
+        separation = segment_sum(first[close], self.avoid(headings[close], distances[close]), n)
+
+        coupling = cohesion + separation + alignment
+        coupling[count == 0] = 0
+        return coupling
+
+    def avoid(self, headings, distances):
+        return avoid(headings, VIEW_RANGE, distances)
+
+    def apply(self, s, targets, extra_speed):
+        size = np.array([self.space.width, self.space.height])
+        actors, rows = s['actors'], s['rows'][s['actors']]
+        pos, heading = s['pos'][actors], s['heading'][actors]
+
+        targets = targets % size
+        heading = unit_vectors(heading + INERTIA * unit_vectors(self.space.get_headings(pos, targets)))
+        new_pos = (pos + heading * (BASE_SPEED * (1 + extra_speed))[:, None]) % size
+
+        store = self.space.store
+        store.heading[rows] = heading
+        store.new_pos[rows] = new_pos
+
+ENGINES = {
+    'object':     ObjectEngine,
+    'vectorized': VectorizedEngine,
+}
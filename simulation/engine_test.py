@@ -0,0 +1,51 @@
+from unittest import TestCase
+import numpy as np
+
+import simulation.environment as env
+from simulation import engine
+from simulation.boids import EPSILON, pick
+
+import gen.toolboxes as tbx
+
+class VectorizedEngineTest(TestCase):
+    def setUp(self):
+        np.random.seed(42)
+        sheep = tbx.sheep(40).population()
+        wolves = tbx.wolves(10).population()
+        self.model = env.Environment(1, engine='vectorized').prepare_model((sheep, wolves), 42)
+        for agent in self.model.schedule.agents:
+            agent.heading = np.random.rand(2) - .5
+        self.model.draw()
+        self.engine = self.model.engine
+        self.state = self.engine.state()
+        self.agents = [self.model.space.agents[idx] for idx in self.state['actors']]
+
+    def object_decisions(self, agent):
+        neighbours = agent.space.neighbours(agent, agent.VIEW_RANGE)
+        return agent.get_weighted_decisions(neighbours), neighbours
+
+    def test_weights_match_object_path(self):
+        weights = self.engine.weights(self.state)
+        for agent, row in zip(self.agents, weights):
+            (_, expected), _ = self.object_decisions(agent)
+            np.testing.assert_array_almost_equal(row[:len(expected)], np.round(expected, 8))
+
+    def test_targets_match_object_path(self):
+        targets, extra_speed = self.engine.targets(self.state)
+        for agent, target, speed in zip(self.agents, targets, extra_speed):
+            (decisions, _), neighbours = self.object_decisions(agent)
+            for k, decide in enumerate(decisions):
+                decision = decide(neighbours)
+                np.testing.assert_array_almost_equal(target[k], decision._pos)
+                self.assertAlmostEqual(1 + 2 * speed[k], decision.cost)
+
+    def test_choices_match_object_path(self):
+        weights = self.engine.weights(self.state)
+        choices = pick(np.cumsum(weights, axis=1), self.state['draw'][self.state['actors']])
+        for agent, choice in zip(self.agents, choices):
+            (_, expected), _ = self.object_decisions(agent)
+            self.assertEqual(pick(np.cumsum(np.round(expected, 8) + EPSILON), agent.draw), choice)
+
+    def test_step(self):
+        self.model.run_model()
+        self.assertEqual(self.model.iter, 2)
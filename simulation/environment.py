@@ -2,11 +2,17 @@ import mesa
 import mesa.time
 import mesa.model
 from simulation import space
+from simulation.engine import ENGINES
+from simulation.profiling import profiled
+from simulation.progress import SILENT
 import numpy as np
 import itertools
-import sys
+import time
+import collections
 
-from simulation.boids import SheepAgent, WolfAgent, Grass
+from simulation.boids import SheepAgent, WolfAgent, GRASS
+from simulation.grass import GrassLayer
+from simulation.trajectory import capture
 
 
 def create_sheep(sheep, space):
@@ -15,31 +21,92 @@ def create_sheep(sheep, space):
 def create_wolves(wolves, space):
     return (WolfAgent(w, space) for w in wolves)
 
-def create_grass(count):
-    return (Grass() for _ in range(count))
-
 def create_population(sheep, wolves, space):
     return itertools.chain(create_sheep(sheep, space),
-                           create_wolves(wolves, space),
-                           create_grass(count=200))
+                           create_wolves(wolves, space))
+
+
+# per-agent results of a simulation, attached to every individual as outcome
+OUTCOMES = 'eaten', 'energy', 'survived'
 
+def outcome(agent):
+    return int(agent.eaten), float(agent.energy), int(agent.survived)
 
 def update_species(species, population):
     sheep, wolves = species
 
     for i, s_agent in enumerate(population[:len(sheep)]):
         sheep[i][:] = s_agent.extract_genes()
-        sheep[i].fitness.values = s_agent.eaten, s_agent.energy
+        sheep[i].fitness.values = int(s_agent.eaten), float(s_agent.energy)
+        sheep[i].outcome = outcome(s_agent)
 
     for i, w_agent in enumerate(population[len(sheep):len(sheep)+len(wolves)]):
         wolves[i][:] = w_agent.extract_genes()
-        wolves[i].fitness.values = w_agent.eaten, w_agent.energy
+        wolves[i].fitness.values = int(w_agent.eaten), float(w_agent.energy)
+        wolves[i].outcome = outcome(w_agent)
 
     return sheep, wolves
 
+# genes, fitness and outcome arrays of every specie
+def species_results(population, counts):
+    results, start = [], 0
+    for count in counts:
+        agents = population[start:start+count]
+        genes = np.array([agent.extract_genes() for agent in agents], dtype=float)
+        outcomes = np.array([outcome(agent) for agent in agents], dtype=float).reshape(count, len(OUTCOMES))
+        results.append((genes.reshape(count, -1) if count else np.zeros((0, 0)),
+                        outcomes[:, :2], outcomes))
+        start += count
+    return results
+
+# termination criteria, checked after every step
+def empty(model):
+    return not model.schedule.agents
+
+# survivors whose food species has died out, grass is never gone for good
+def starving(agents):
+    food = {agent.SPECIES for agent in agents} | {GRASS}
+    return [agent for agent in agents if agent.FOOD not in food]
+
+# Nobody can eat any more, so what every agent has eaten is final. While any
+# survivor can still feed, e.g. sheep with grass left, the run goes on.
+def extinct(model):
+    agents = model.schedule.agents
+    return bool(agents) and len(starving(agents)) == len(agents)
+
+def over_budget(model):
+    return time.perf_counter() - model.started > model.budget
+
+CRITERIA = {
+    'empty':   empty,
+    'extinct': extinct,
+    'budget':  over_budget,
+}
+
+# independent generators derived from one seed
+def generators(seed, count):
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(count)]
+
+# array in, arrays out entry point used by worker processes
+def simulate(genomes, seed, steps=500, deferred=False, engine='object', stop=('empty',), budget=None,
+             grass_patches=200, regrowth=None, index='grid'):
+    model = Environment(steps, deferred, engine, stop=stop, budget=budget,
+                        grass_patches=grass_patches, regrowth=regrowth, index=index).prepare_model(genomes, seed)
+    model.run_model()
+    return species_results(model.get_results(), [len(genes) for genes in genomes])
+
 class Environment:
-    def __init__(self, steps=500):
+    def __init__(self, steps=500, deferred=False, engine='object', progress=SILENT,
+                 stop=('empty',), budget=None, grass_patches=200, regrowth=None, index='grid'):
         self.steps = steps
+        self.deferred = deferred
+        self.engine = engine
+        self.progress = progress
+        self.stop = stop
+        self.budget = budget
+        self.grass_patches = grass_patches
+        self.regrowth = regrowth
+        self.index = index
 
     def run_simulation(self, species, seed):
         model = self.prepare_model(species, seed)
@@ -47,45 +114,123 @@ class Environment:
         population = model.get_results()
         return update_species(species, population),
 
-    def prepare_model(self, species, seed):
-        model = Model(seed, self.steps)
+    def prepare_model(self, species, seed, recorder=None):
+        model = Model(seed, self.steps, self.deferred, self.engine, self.progress, self.stop, self.budget,
+                      self.grass_patches, self.regrowth, recorder, self.index)
         population = create_population(*species, model.space)
         model.add_population(population)
         return model
 
 class Model(mesa.model.Model):
-    def __init__(self, seed, steps):
+    # stop names CRITERIA ending the run before steps, a budget in seconds
+    # adds the wall-clock criterion, grass_patches is the number of patches,
+    # a TrajectoryRecorder saves every step for replay, index names the
+    # spatial index of the agent space
+    def __init__(self, seed, steps, deferred=False, engine='object', progress=SILENT,
+                 stop=('empty',), budget=None, grass_patches=200, regrowth=None, recorder=None, index='grid'):
         super(Model, self).__init__(seed)
         self.iter = 0
         self.steps = steps
+        self.deferred = deferred
+        self.progress = progress
+        self.budget = budget
+        if budget is not None and 'budget' not in stop:
+            stop = tuple(stop) + ('budget',)
+        self.criteria = [(name, CRITERIA[name]) for name in stop]
+        self.stop_reason = None
+        self.grass_patches = grass_patches
+        self.regrowth = regrowth
+        self.recorder = recorder
+        self._frame = None
+        self.started = time.perf_counter()
+        # all randomness of a run comes from its seed, one stream per purpose
+        self.placement_rng, self.decision_rng = generators(seed, 2)
 
         self.schedule = mesa.time.SimultaneousActivation(self)
-        self.space = space.CachedSpace()
+        self.space = space.CachedSpace(index)
+        self.engine = ENGINES[engine](self)
+        self.space_counters = []
 
     def add_population(self, population):
         self.population = list(population)
-        for agent in self.population:
-            self.space.place_agent(agent, pos=np.random.rand(2))
+        positions = self.placement_rng.random((len(self.population), 2))
+        for agent, pos in zip(self.population, positions):
+            self.space.place_agent(agent, pos=pos)
             if agent.energy > 0:
                 self.schedule.add(agent)
+        self.space.grass = GrassLayer(self.placement_rng.random((self.grass_patches, 2)), self.regrowth)
+        self.rows = np.array([agent._row for agent in self.population], dtype=int)
+        if self.recorder is not None:
+            self.recorder.start(self)
 
+    @profiled('model.step')
     def step(self):
-        self.schedule.step()
+        self.draw()
+        self.space.grass.step()
+        if self.deferred:
+            self.space.begin_batch()
+        self.engine.step()
+        if self.deferred:
+            self.space.commit_batch()
         self.clean_up()
+        self.space_counters.append(self.space.reset_counters())
         self.update_results()
+        if self.recorder is not None:
+            self.recorder.record(self)
+            if not self.running:
+                self.recorder.close()
     
+    # one uniform per agent, read by the decisions of this step
+    def draw(self):
+        store = self.space.store
+        store.draw[:store.size] = self.decision_rng.random(store.size)
+
+    @profiled('model.clean_up')
     def clean_up(self):
         agents_to_remove = [agent
                             for agent in self.schedule.agents
                             if  agent.energy <= 0]
         for agent in agents_to_remove:
+            agent.survived = self.iter + 1
             self.schedule.remove(agent)
 
     def update_results(self):
         self.iter += 1
-        sys.stdout.write("\r%d" % self.iter,)
-        sys.stdout.flush()
         self.running = self.iter <= self.steps
+        if not self.running:
+            self.stop_reason = 'steps'
+            self.finalize()
+        else:
+            self.stop_reason = next((name for name, criterion in self.criteria if criterion(self)), None)
+            if self.stop_reason is not None:
+                self.finalize()
+                self.running = False
+        if self.progress.due('step'):
+            self.progress.event('step', step=self.iter, steps=self.steps,
+                                rate=self.iter / (time.perf_counter() - self.started), alive=self.alive())
+
+    # Agents whose food is gone can only lose energy, each of the skipped
+    # steps costs them as much as their last decision. Agents which still
+    # can feed, only left behind by the budget criterion, keep the state they
+    # have reached. Survivors are credited with the steps they lived through,
+    # starving ones with the steps their energy lasts.
+    def finalize(self):
+        remaining = self.steps + 1 - self.iter
+        for agent in self.schedule.agents:
+            agent.survived = self.iter
+        for agent in starving(self.schedule.agents):
+            lasts = remaining if agent.cost <= 0 else min(remaining, int(np.ceil(agent.energy / agent.cost)))
+            agent.survived = self.iter + lasts
+            agent.energy = max(0., agent.energy - remaining * agent.cost)
+
+    # one snapshot per step, shared by everything that draws the step
+    def frame(self):
+        if self._frame is None or self._frame.step != self.iter:
+            self._frame = capture(self)
+        return self._frame
+
+    def alive(self):
+        return dict(collections.Counter(type(agent).__name__ for agent in self.schedule.agents))
 
     def get_results(self):
         return self.population
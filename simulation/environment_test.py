@@ -1,6 +1,10 @@
 from unittest import TestCase, mock
+import random
+
+import numpy as np
 
 import simulation.environment as env
+from simulation.boids import SheepAgent, WolfAgent
 
 import gen.toolboxes as tbx
 
@@ -26,4 +30,118 @@ class TestEnvironment(TestCase):
         self.assertEqual(((sheep, wolves),),
                          (species,))
         self.assertEqual(contains_fitness(sheep), [True]*3)
-        self.assertEqual(contains_fitness(wolves), [True]*3)
\ No newline at end of file
+        self.assertEqual(contains_fitness(wolves), [True]*3)
+        for individual in sheep + wolves:
+            eaten, energy, survived = individual.outcome
+            self.assertEqual(eaten, individual.fitness.values[0])
+            self.assertAlmostEqual(energy, individual.fitness.values[1])
+            self.assertIn(survived, (2,) if energy > 0 else (1, 2))
+
+class TestDeferredModel(TestCase):
+    def test_single_space_update_per_step(self):
+        sheep = tbx.sheep(10).population()
+        wolves = tbx.wolves(5).population()
+        model = env.Environment(5, deferred=True).prepare_model((sheep, wolves), 42)
+        model.run_model()
+        for counters in model.space_counters[1:]:
+            self.assertLessEqual(counters['rebuilds'] + counters['patches'], 1)
+
+class TestReproducibility(TestCase):
+    def setUp(self):
+        self.genomes = [np.random.rand(10, 7), np.random.rand(4, 5)]
+
+    def run_simulation(self, seed):
+        return env.simulate(self.genomes, seed, steps=10)
+
+    def test_same_seed_same_results(self):
+        for (genes, fitness, _), (other_genes, other_fitness, _) in zip(self.run_simulation(3), self.run_simulation(3)):
+            np.testing.assert_array_equal(genes, other_genes)
+            np.testing.assert_array_equal(fitness, other_fitness)
+
+    def test_independent_of_global_generators(self):
+        first = self.run_simulation(3)
+        np.random.seed(0)
+        random.seed(0)
+        np.testing.assert_array_equal(first[0][1], self.run_simulation(3)[0][1])
+
+    def test_placement_depends_on_seed(self):
+        species = tbx.sheep(5).population(), tbx.wolves(2).population()
+        first = env.Environment(1).prepare_model(species, 1).space.store.pos
+        second = env.Environment(1).prepare_model(species, 2).space.store.pos
+        self.assertFalse(np.array_equal(first, second))
+
+class TestTermination(TestCase):
+    def model(self, steps=50, **kwargs):
+        species = tbx.sheep(6).population(), tbx.wolves(3).population()
+        return env.Environment(steps, **kwargs).prepare_model(species, 42)
+
+    def test_runs_all_steps(self):
+        model = self.model(3)
+        model.run_model()
+        self.assertEqual((model.iter, model.stop_reason), (4, 'steps'))
+
+    def test_stops_when_empty(self):
+        model = self.model()
+        for agent in list(model.schedule.agents):
+            agent.die()
+        model.clean_up()
+        model.run_model()
+        self.assertEqual((model.iter, model.stop_reason), (1, 'empty'))
+
+    def test_extinction_finalizes_starving_agents(self):
+        model = self.model(stop=('extinct',))
+        model.step()
+        for agent in list(model.schedule.agents):
+            if isinstance(agent, SheepAgent):
+                agent.die()
+        model.clean_up()
+        wolves = [agent for agent in model.schedule.agents if isinstance(agent, WolfAgent)]
+        energy = [wolf.energy for wolf in wolves]
+        model.update_results()
+        self.assertEqual((model.running, model.stop_reason), (False, 'extinct'))
+        for wolf, start in zip(wolves, energy):
+            self.assertAlmostEqual(wolf.energy, max(0, start - 49 * wolf.cost))
+
+    # wolves are gone from the start, sheep still have grass to eat
+    def sheep_outcomes(self, **kwargs):
+        random.seed(1)
+        model = self.model(60, **kwargs)
+        for agent in list(model.schedule.agents):
+            if isinstance(agent, WolfAgent):
+                agent.die()
+        model.clean_up()
+        model.run_model()
+        return [env.outcome(agent) for agent in model.population if isinstance(agent, SheepAgent)], model
+
+    def test_extinct_matches_full_run_while_food_is_left(self):
+        outcomes, model = self.sheep_outcomes(stop=('extinct',))
+        full, _ = self.sheep_outcomes()
+        self.assertEqual(model.stop_reason, 'steps')
+        self.assertEqual(outcomes, full)
+
+    def test_survival(self):
+        model = self.model(3)
+        model.step()
+        dead = model.schedule.agents[0]
+        dead.die()
+        model.step()
+        model.run_model()
+        self.assertEqual(dead.survived, 2)
+        self.assertEqual({agent.survived for agent in model.schedule.agents}, {4})
+
+    def test_starving_agents_survive_while_energy_lasts(self):
+        model = self.model(stop=('extinct',))
+        model.step()
+        for agent in list(model.schedule.agents):
+            if isinstance(agent, SheepAgent):
+                agent.die()
+        model.clean_up()
+        wolf = next(agent for agent in model.schedule.agents if isinstance(agent, WolfAgent))
+        wolf.energy, wolf.cost = 10, 3
+        model.update_results()
+        self.assertEqual((wolf.survived, wolf.energy), (2 + 4, 0))
+
+    def test_budget(self):
+        model = self.model(budget=0)
+        model.run_model()
+        self.assertEqual((model.iter, model.stop_reason), (1, 'budget'))
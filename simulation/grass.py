@@ -0,0 +1,70 @@
+import numpy as np
+
+from simulation.index import GridIndex, minimum_image
+from simulation.boids import GRASS_RADIUS
+
+
+# Grass never moves, so it lives outside of the agent space and is indexed
+# once per simulation. Without regrowth grass is never used up, otherwise
+# an eaten patch is gone for regrowth steps.
+class GrassLayer:
+    RADIUS = GRASS_RADIUS
+    COLOR = 'green'
+
+    def __init__(self, pos, regrowth=None):
+        self.pos = np.array(pos, dtype=float).reshape(-1, 2)
+        self.regrowth = regrowth
+        self.available = np.ones(len(self.pos), dtype=bool)
+        self.timer = np.zeros(len(self.pos), dtype=int)
+        self.index = GridIndex()
+        self.index.build(self.pos)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def step(self):
+        if self.regrowth is not None:
+            self.timer = np.maximum(self.timer - 1, 0)
+            self.available = self.timer == 0
+
+    # index of and heading towards the closest available patch within radius
+    # of every point, -1 and a zero heading when there is none
+    def nearest(self, points, radius):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) == 1:
+            return self._nearest(points[0], radius)
+        first, second = self.index.pairs(radius, points)
+        keep = self.available[second]
+        first, second = first[keep], second[keep]
+        headings = minimum_image(self.pos[second] - points[first])
+        order = np.lexsort((np.einsum('ij,ij->i', headings, headings), first))
+        first, second, headings = first[order], second[order], headings[order]
+
+        found = np.full(len(points), -1)
+        nearest = np.zeros((len(points), 2))
+        queries, at = np.unique(first, return_index=True)
+        found[queries] = second[at]
+        nearest[queries] = headings[at]
+        return found, nearest
+
+    # single point case of nearest, which agents ask for one by one
+    def _nearest(self, point, radius):
+        idxs = self.colliding(point, radius)
+        if not len(idxs):
+            return np.array([-1]), np.zeros((1, 2))
+        headings = minimum_image(self.pos[idxs] - point)
+        closest = np.argmin(np.einsum('ij,ij->i', headings, headings))
+        return idxs[closest:closest + 1], headings[closest:closest + 1]
+
+    # available patches within radius of a point, nearest first
+    def colliding(self, point, radius):
+        point = np.asarray(point, dtype=float)
+        idxs = self.index.query_point(point, radius)
+        idxs = idxs[self.available[idxs]]
+        headings = minimum_image(self.pos[idxs] - point)
+        return idxs[np.argsort(np.einsum('ij,ij->i', headings, headings), kind='stable')]
+
+    def eat(self, idxs):
+        if self.regrowth is not None:
+            self.timer[idxs] = self.regrowth
+            self.available[idxs] = False
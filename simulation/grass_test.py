@@ -0,0 +1,101 @@
+from unittest import TestCase
+import numpy as np
+
+from simulation import boids, space
+from simulation.grass import GrassLayer
+from simulation.index import minimum_image
+
+
+class GrassLayerTest(TestCase):
+    def setUp(self):
+        np.random.seed(42)
+        self.grass = GrassLayer(np.random.rand(200, 2))
+
+    def distances(self, points):
+        return np.linalg.norm(minimum_image(self.grass.pos[None] - points[:, None]), axis=2)
+
+    def test_nearest_matches_brute_force(self):
+        points = np.random.rand(50, 2)
+        found, headings = self.grass.nearest(points, .1)
+
+        distances = self.distances(points)
+        close = distances.min(axis=1) <= .1
+        np.testing.assert_array_equal(found[close], distances.argmin(axis=1)[close])
+        np.testing.assert_array_equal(found[~close], -1)
+        np.testing.assert_array_almost_equal(np.linalg.norm(headings[close], axis=1), distances.min(axis=1)[close])
+
+    def test_colliding(self):
+        point = self.grass.pos[7] + [.001, 0]
+        self.assertIn(7, self.grass.colliding(point, .01))
+        distances = self.distances(point[None])[0]
+        close, = np.nonzero(distances <= .01)
+        np.testing.assert_array_equal(self.grass.colliding(point, .01), close[np.argsort(distances[close])])
+
+    def test_never_depleted_by_default(self):
+        self.grass.eat([7])
+        self.assertTrue(self.grass.available[7])
+
+    def test_regrowth(self):
+        grass = GrassLayer(self.grass.pos, regrowth=2)
+        grass.eat([7])
+        self.assertNotIn(7, grass.colliding(grass.pos[7], .001))
+        self.assertNotEqual(grass.nearest(grass.pos[7], .001)[0][0], 7)
+        grass.step()
+        self.assertFalse(grass.available[7])
+        grass.step()
+        self.assertTrue(grass.available[7])
+
+class SheepFeedingTest(TestCase):
+    def setUp(self):
+        self.space = space.CachedSpace()
+        self.space.grass = GrassLayer([[.5, .5]], regrowth=10)
+        self.sheep = boids.SheepAgent(np.zeros(7), self.space)
+        self.sheep.energy = 100
+
+    def feed(self, pos):
+        self.space.place_agent(self.sheep, pos)
+        self.sheep.new_pos = pos
+        self.sheep.find_food([])
+
+    def test_eats_colliding_grass(self):
+        self.feed(np.array([.505, .5]))
+        self.assertEqual((self.sheep.energy, self.sheep.eaten), (100 + boids.SHEEP_EAT_ENERGY, 1))
+        self.assertFalse(self.space.grass.available[0])
+
+    def test_no_grass_no_food(self):
+        self.feed(np.array([.1, .1]))
+        self.assertEqual((self.sheep.energy, self.sheep.eaten), (100, 0))
+
+    # a patch eaten during a batch is only gone once the batch is committed,
+    # the first sheep to feed claims it
+    def test_contested_patch_is_eaten_once(self):
+        for detect in False, True:
+            for order in (0, 1), (1, 0):
+                cached = space.CachedSpace()
+                cached.grass = GrassLayer([[.5, .5]], regrowth=10)
+                flock = [boids.SheepAgent(np.zeros(7), cached) for _ in range(2)]
+                for sheep, pos in zip(flock, ([.504, .5], [.496, .5])):
+                    cached.place_agent(sheep, np.array(pos))
+                    sheep.new_pos = np.array(pos)
+                cached.begin_batch()
+                if detect:
+                    cached.detect_collisions(flock)
+                for i in order:
+                    flock[i].find_food([])
+                cached.commit_batch()
+                with self.subTest(detect=detect, order=order):
+                    self.assertEqual([flock[i].eaten for i in order], [1, 0])
+                    self.assertFalse(cached.grass.available[0])
+
+    def test_unlimited_grass_feeds_every_sheep(self):
+        cached = space.CachedSpace()
+        cached.grass = GrassLayer([[.5, .5]])
+        flock = [boids.SheepAgent(np.zeros(7), cached) for _ in range(2)]
+        for sheep, pos in zip(flock, ([.504, .5], [.496, .5])):
+            cached.place_agent(sheep, np.array(pos))
+            sheep.new_pos = np.array(pos)
+        cached.begin_batch()
+        for sheep in flock:
+            sheep.find_food([])
+        cached.commit_batch()
+        self.assertEqual([sheep.eaten for sheep in flock], [1, 1])
@@ -0,0 +1,141 @@
+import numpy as np
+import scipy.spatial.distance
+
+
+SHIFTS = np.array([np.array([x, y])
+                   for x in [0, 1]
+                   for y in [0, 1]])
+
+def minimum_image(headings, size=1):
+    return headings - size * np.round(headings / size)
+
+class DenseIndex:
+    # reference backend, dense (N, N) matrix of periodic distances
+    def build(self, pos):
+        self.pos = np.array(pos, dtype=float).reshape(-1, 2)
+        l = len(pos)
+        shifts = pos + SHIFTS.reshape(4,1,2)
+        shifts = shifts.reshape(4*l, 2)
+        self._distances = scipy.spatial.distance.pdist(shifts)
+        self._distances = scipy.spatial.distance.squareform(self._distances)
+        self._distances = self._distances.reshape(4, l, 4, l)
+        self._distances = self._distances.swapaxes(1, 2)
+        self._distances = self._distances.reshape(4*4, l, l)
+        self._distances = self._distances.min(axis=0)
+
+    def query(self, idx, radius):
+        idxs, = np.nonzero(self._distances[idx] <= radius)
+        return idxs
+
+    def query_point(self, point, radius):
+        idxs, = np.nonzero(np.linalg.norm(minimum_image(self.pos - point), axis=1) <= radius)
+        return idxs
+
+    def pairs(self, radius):
+        return np.nonzero(self._distances <= radius)
+
+    # recomputes rows and columns of the moved agents only
+    def patch(self, idxs, pos):
+        self.pos[idxs] = pos
+        distances = np.linalg.norm(minimum_image(self.pos[None, :] - self.pos[idxs, None]), axis=2)
+        self._distances[idxs, :] = distances
+        self._distances[:, idxs] = distances.T
+        return True
+
+class GridIndex:
+    # uniform cell grid over the torus, agents sorted by cell id
+    def __init__(self, cell_size=1e-1, size=1, max_stale=1/8):
+        self.size = size
+        self.cells_per_side = max(1, int(size / cell_size))
+        self.cell_size = size / self.cells_per_side
+        self.max_stale = max_stale
+
+    def build(self, pos):
+        self.pos = np.array(pos, dtype=float).reshape(-1, 2)
+        self._cells = self._cell_of(self.pos)
+        self._order = np.argsort(self._cells, kind='stable')
+        counts = np.bincount(self._cells, minlength=self.cells_per_side ** 2)
+        self._starts = np.concatenate(([0], np.cumsum(counts)))
+        self._stale = np.zeros(len(self.pos), dtype=bool)
+        self._stale_idxs = np.zeros(0, dtype=int)
+        self._block_cache = {}
+
+    # agents which left their cell are kept aside and scanned linearly,
+    # until there are too many of them and the grid is rebuilt
+    def patch(self, idxs, pos):
+        self.pos[idxs] = pos
+        self._stale[idxs] = self._cell_of(self.pos[idxs]) != self._cells[idxs]
+        self._stale_idxs, = np.nonzero(self._stale)
+        if len(self._stale_idxs) > max(8, self.max_stale * len(self.pos)):
+            self.build(self.pos)
+            return False
+        return True
+
+    def query(self, idx, radius):
+        return self.query_point(self.pos[idx], radius)
+
+    # indexed agents within radius of an arbitrary point
+    def query_point(self, point, radius):
+        candidates = self._candidates(point, radius)
+        candidates = np.concatenate((candidates[~self._stale[candidates]], self._stale_idxs))
+        headings = minimum_image(self.pos[candidates] - point, self.size)
+        inside = np.einsum('ij,ij->i', headings, headings) <= radius * radius
+        return np.sort(candidates[inside])
+
+    # all (i, j) pairs of points i and indexed agents j within radius,
+    # sorted by i then j; points default to the agents, i == j included
+    def pairs(self, radius, points=None):
+        if len(self._stale_idxs):
+            self.build(self.pos)
+        points = self.pos if points is None else np.asarray(points, dtype=float).reshape(-1, 2)
+        n = self.cells_per_side
+        reach = int(np.ceil(radius / self.cell_size))
+        span = np.unique(np.arange(-reach, reach + 1) % n)
+        own = self._cell_of(points)
+        cx, cy = own % n, own // n
+        queries = np.arange(len(points))
+        firsts, seconds = [], []
+        for dy in span:
+            for dx in span:
+                cells = (cy + dy) % n * n + (cx + dx) % n
+                counts = self._starts[cells + 1] - self._starts[cells]
+                first = np.repeat(queries, counts)
+                second = self._members(cells)
+                headings = minimum_image(self.pos[second] - points[first], self.size)
+                inside = np.einsum('ij,ij->i', headings, headings) <= radius * radius
+                firsts.append(first[inside])
+                seconds.append(second[inside])
+        first, second = np.concatenate(firsts), np.concatenate(seconds)
+        order = np.lexsort((second, first))
+        return first[order], second[order]
+
+    def _cell_of(self, pos):
+        n = self.cells_per_side
+        cxy = np.floor(pos / self.cell_size).astype(int) % n
+        return cxy[..., 1] * n + cxy[..., 0]
+
+    # members of the block of cells around the cell of point, remembered
+    # until the next build as many queries start from the same cell
+    def _candidates(self, point, radius):
+        n = self.cells_per_side
+        reach = int(np.ceil(radius / self.cell_size))
+        cx, cy = np.floor(point / self.cell_size).astype(int) % n
+        key = cx, cy, reach
+        members = self._block_cache.get(key)
+        if members is None:
+            span = np.arange(-reach, reach + 1)
+            xs = np.unique((cx + span) % n)
+            ys = np.unique((cy + span) % n)
+            members = self._block_cache[key] = self._members((ys[:, None] * n + xs[None, :]).ravel())
+        return members
+
+    def _members(self, cells):
+        begin = self._starts[cells]
+        counts = self._starts[cells + 1] - begin
+        offsets = np.repeat(begin - np.cumsum(counts) + counts, counts)
+        return self._order[offsets + np.arange(counts.sum())]
+
+INDEXES = {
+    'dense': DenseIndex,
+    'grid':  GridIndex,
+}
@@ -0,0 +1,51 @@
+from unittest import TestCase
+import numpy as np
+
+from simulation import index
+
+class GridIndexTest(TestCase):
+    def setUp(self):
+        np.random.seed(42)
+        self.pos = np.random.rand(300, 2)
+        self.dense = index.DenseIndex()
+        self.dense.build(self.pos)
+
+    def assert_same_as_dense(self, grid):
+        grid.build(self.pos)
+        self.assert_same_queries(grid)
+
+    def assert_same_queries(self, grid):
+        for radius in 1e-2, 1e-1, .3, 1:
+            for idx in range(0, len(self.pos), 7):
+                np.testing.assert_array_equal(self.dense.query(idx, radius),
+                                              grid.query(idx, radius),
+                                              err_msg='agent %d, radius %s' % (idx, radius))
+
+    def test_matches_dense(self):
+        self.assert_same_as_dense(index.GridIndex())
+
+    def test_matches_dense_with_fine_cells(self):
+        self.assert_same_as_dense(index.GridIndex(cell_size=1e-2))
+
+    def test_matches_dense_with_single_cell(self):
+        self.assert_same_as_dense(index.GridIndex(cell_size=1))
+
+    def test_patch_matches_dense(self):
+        grid = index.GridIndex()
+        grid.build(self.pos)
+        for _ in range(5):
+            idxs = np.random.choice(len(self.pos), 10, replace=False)
+            self.pos[idxs] = np.random.rand(10, 2)
+            grid.patch(idxs, self.pos[idxs])
+            self.assertTrue(self.dense.patch(idxs, self.pos[idxs]))
+        self.assert_same_queries(grid)
+
+    def test_patch_rebuilds_when_too_stale(self):
+        grid = index.GridIndex()
+        grid.build(self.pos)
+        self.assertFalse(grid.patch(np.arange(len(self.pos)), np.random.rand(len(self.pos), 2)))
+
+    def test_empty(self):
+        grid = index.GridIndex()
+        grid.build(np.zeros((0, 2)))
+        self.assertEqual(len(grid._order), 0)
@@ -0,0 +1,50 @@
+import multiprocessing
+
+import numpy as np
+
+from simulation.environment import Environment, simulate
+
+
+def warm_up():
+    import deap, mesa, scipy.spatial
+    import simulation.environment
+
+def replicate_seeds(seed, replicates):
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(replicates)]
+
+def genomes(species):
+    return [np.array(population, dtype=float).reshape(len(population), -1) if population
+            else np.zeros((0, 0))
+            for population in species]
+
+# Evaluates every generation as several independent replicates on a pool
+# of worker processes which is kept alive between generations.
+class ReplicatedEnvironment(Environment):
+    def __init__(self, steps=500, replicates=4, processes=None, reducer=np.mean,
+                 deferred=False, engine='object', stop=('empty',), budget=None, grass_patches=200, regrowth=None):
+        super(ReplicatedEnvironment, self).__init__(steps, deferred, engine, stop=stop, budget=budget,
+                                                    grass_patches=grass_patches, regrowth=regrowth)
+        self.replicates = replicates
+        self.reducer = reducer
+        self.pool = multiprocessing.Pool(processes, initializer=warm_up)
+
+    def run_simulation(self, species, seed):
+        arrays = genomes(species)
+        jobs = [(arrays, s, self.steps, self.deferred, self.engine, self.stop, self.budget,
+                 self.grass_patches, self.regrowth)
+                for s in replicate_seeds(seed, self.replicates)]
+        replicates = self.pool.starmap(simulate, jobs)
+
+        for i, population in enumerate(species):
+            genes = replicates[0][i][0]
+            fitness = self.reducer(np.stack([results[i][1] for results in replicates]), axis=0)
+            outcomes = self.reducer(np.stack([results[i][2] for results in replicates]), axis=0)
+            for individual, ind_genes, ind_fitness, ind_outcome in zip(population, genes, fitness, outcomes):
+                individual[:] = ind_genes.tolist()
+                individual.fitness.values = tuple(ind_fitness.tolist())
+                individual.outcome = tuple(ind_outcome.tolist())
+        return species,
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
@@ -0,0 +1,37 @@
+from unittest import TestCase
+import numpy as np
+
+from simulation import parallel
+from simulation.environment import simulate
+
+import gen.toolboxes as tbx
+
+class ReplicatedEnvironmentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.env = parallel.ReplicatedEnvironment(steps=2, replicates=3, processes=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.env.close()
+
+    def setUp(self):
+        self.species = tbx.sheep(4).population(), tbx.wolves(2).population()
+
+    def test_fitness_is_mean_of_replicates(self):
+        genomes = parallel.genomes(self.species)
+        runs = [simulate(genomes, seed, steps=2)
+                for seed in parallel.replicate_seeds(42, 3)]
+
+        (sheep, wolves), = self.env.run_simulation(self.species, 42)
+
+        for i, population in enumerate((sheep, wolves)):
+            expected = np.mean([run[i][1] for run in runs], axis=0)
+            np.testing.assert_array_almost_equal([ind.fitness.values for ind in population],
+                                                 expected)
+
+    def test_replicates_use_different_seeds(self):
+        self.assertEqual(len(set(parallel.replicate_seeds(42, 3))), 3)
+
+    def test_empty_species(self):
+        self.assertEqual(self.env.run_simulation(([], []), 42), (([], []),))
@@ -0,0 +1,48 @@
+import time
+import functools
+
+
+# Accumulates call counts and wall-clock time of named phases. Timing only
+# happens while enabled, otherwise profiled functions cost one flag check.
+# Only the entry point of a phase is profiled, so no time is counted twice.
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.phases = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def add(self, name, seconds, calls=1):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = [0, 0.]
+        phase[0] += calls
+        phase[1] += seconds
+
+    def report(self):
+        return {name: {'calls': calls, 'seconds': seconds}
+                for name, (calls, seconds) in sorted(self.phases.items())}
+
+    def reset(self):
+        report, self.phases = self.report(), {}
+        return report
+
+PROFILER = Profiler()
+
+def profiled(name, profiler=PROFILER):
+    def decorator(foo):
+        @functools.wraps(foo)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return foo(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return foo(*args, **kwargs)
+            finally:
+                profiler.add(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,50 @@
+from unittest import TestCase, mock
+
+import numpy as np
+
+from simulation import profiling, space
+
+class ProfilerTest(TestCase):
+    def setUp(self):
+        self.profiler = profiling.Profiler()
+        self.foo = profiling.profiled('foo', self.profiler)(lambda x: x + 1)
+
+    def test_disabled_does_not_record(self):
+        self.assertEqual(self.foo(1), 2)
+        self.assertEqual(self.profiler.report(), {})
+
+    def test_counts_calls(self):
+        self.profiler.enable()
+        for i in range(3):
+            self.foo(i)
+        report = self.profiler.reset()
+
+        self.assertEqual(report['foo']['calls'], 3)
+        self.assertGreaterEqual(report['foo']['seconds'], 0)
+        self.assertEqual(self.profiler.report(), {})
+
+    def test_records_failing_calls(self):
+        self.profiler.enable()
+        with self.assertRaises(TypeError):
+            self.foo(None)
+        self.assertEqual(self.profiler.report()['foo']['calls'], 1)
+
+    def test_keeps_name_and_docstring(self):
+        def foo():
+            """docstring"""
+        profiled = profiling.profiled('foo', self.profiler)(foo)
+        self.assertEqual((profiled.__name__, profiled.__doc__), ('foo', 'docstring'))
+
+    def test_neighbour_queries_are_counted_once(self):
+        cached = space.CachedSpace()
+        agent = mock.MagicMock()
+        cached.place_agent(agent, np.array([.5, .5]))
+        profiling.PROFILER.reset()
+        profiling.PROFILER.enable()
+        try:
+            list(cached.get_neighbors(agent, .1))
+        finally:
+            profiling.PROFILER.disable()
+        report = profiling.PROFILER.reset()
+        self.assertEqual(report['space.neighbours']['calls'], 1)
+        self.assertNotIn('space.get_neighbors', report)
@@ -0,0 +1,69 @@
+import abc
+import sys
+import json
+import time
+
+from simulation.serialization import to_builtin
+
+
+# Receives named progress events, e.g. 'step' from Model and 'generation'
+# from Stats. Callers ask due() before collecting the fields of an event, so
+# the default reporter costs one call per step and never writes anything.
+class Progress:
+    def due(self, name):
+        return False
+
+    def event(self, name, **fields):
+        pass
+
+SILENT = Progress()
+
+# Lets an event through at most once per interval seconds of wall-clock time,
+# events named in always are never dropped. Subclasses write the events out.
+class Reporter(Progress, abc.ABC):
+    def __init__(self, interval=1., always=('generation',), clock=time.monotonic):
+        self.interval = interval
+        self.always = always
+        self.clock = clock
+        self.last = {}
+
+    def due(self, name):
+        if name in self.always or name not in self.last:
+            return True
+        return self.clock() - self.last[name] >= self.interval
+
+    def event(self, name, **fields):
+        self.last[name] = self.clock()
+        self.emit(name, fields)
+
+    @abc.abstractmethod
+    def emit(self, name, fields):
+        pass
+
+# human readable, the step counter is rewritten in place
+class StreamProgress(Reporter):
+    def __init__(self, stream=None, interval=1., **kwargs):
+        super(StreamProgress, self).__init__(interval, **kwargs)
+        self.stream = stream
+
+    def emit(self, name, fields):
+        stream = self.stream or sys.stdout
+        if name == 'step':
+            alive = ' '.join('%s=%d' % item for item in sorted(fields['alive'].items()))
+            stream.write('\rstep %d/%d %8.1f steps/s %s' % (fields['step'], fields['steps'], fields['rate'], alive))
+        elif name == 'generation':
+            stream.write('\r%s\n' % fields['text'])
+        else:
+            stream.write('\r%s %s\n' % (name, fields))
+        stream.flush()
+
+# one JSON object per event, e.g. for log collectors
+class JsonlProgress(Reporter):
+    def __init__(self, path, interval=1., **kwargs):
+        super(JsonlProgress, self).__init__(interval, **kwargs)
+        self.path = path
+
+    def emit(self, name, fields):
+        record = dict(event=name, time=time.time(), **{k: v for k, v in fields.items() if k != 'text'})
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, default=to_builtin) + '\n')
@@ -0,0 +1,88 @@
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from simulation import progress
+from simulation.environment import Environment
+import gen.toolboxes as tbx
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+class Recorder(progress.Reporter):
+    def __init__(self, *args, **kwargs):
+        super(Recorder, self).__init__(*args, **kwargs)
+        self.events = []
+
+    def emit(self, name, fields):
+        self.events.append((name, fields))
+
+class ReporterTest(TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.reporter = Recorder(interval=1., clock=self.clock)
+
+    def report(self, name, **fields):
+        if self.reporter.due(name):
+            self.reporter.event(name, **fields)
+
+    def test_silent_by_default(self):
+        self.assertFalse(progress.SILENT.due('step'))
+        self.assertFalse(progress.SILENT.due('generation'))
+
+    def test_reporters_must_emit(self):
+        with self.assertRaises(TypeError):
+            progress.Reporter()
+
+    def test_rate_limited(self):
+        for step in range(5):
+            self.report('step', step=step)
+            self.clock.now += .4
+
+        self.assertEqual([fields['step'] for _, fields in self.reporter.events], [0, 3])
+
+    def test_generations_always_reported(self):
+        for gen in range(3):
+            self.report('step', step=gen)
+            self.report('generation', gen=gen)
+
+        self.assertEqual([name for name, _ in self.reporter.events], ['step', 'generation', 'generation', 'generation'])
+
+class SinksTest(TestCase):
+    def test_stream(self):
+        stream = io.StringIO()
+        reporter = progress.StreamProgress(stream)
+        reporter.event('step', step=1, steps=10, rate=5., alive={'SheepAgent': 3})
+        reporter.event('generation', text='gen 0')
+
+        self.assertEqual(stream.getvalue(), '\rstep 1/10      5.0 steps/s SheepAgent=3\rgen 0\n')
+
+    def test_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'progress.jsonl')
+            reporter = progress.JsonlProgress(path)
+            reporter.event('generation', gen=0, seconds=1.5, text='gen 0')
+
+            with open(path) as f:
+                record = json.loads(f.read())
+        self.assertEqual(record['event'], 'generation')
+        self.assertEqual(record['seconds'], 1.5)
+        self.assertNotIn('text', record)
+
+class ModelProgressTest(TestCase):
+    def test_step_events(self):
+        reporter = Recorder(interval=0)
+        species, = tbx.environment(tbx.darwinian(tbx.sheep(count=4)), tbx.lamarckian(tbx.wolves(count=2))).population()
+        Environment(3, progress=reporter).run_simulation(species, 0)
+
+        steps = [fields for name, fields in reporter.events if name == 'step']
+        self.assertEqual([fields['step'] for fields in steps], [1, 2, 3, 4])
+        self.assertEqual(steps[0]['alive'], {'SheepAgent': 4, 'WolfAgent': 2})
+        self.assertGreater(steps[0]['rate'], 0)
@@ -0,0 +1,10 @@
+import numpy as np
+
+
+# json.dumps default for the numpy values found in records and stats
+def to_builtin(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError('%r is not JSON serializable' % (value,))
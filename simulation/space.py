@@ -1,80 +1,234 @@
 import numpy as np
-import scipy.spatial.distance
 
 from mesa import space
 
+from simulation.index import SHIFTS, INDEXES, minimum_image
+from simulation.store import AgentStore, StoredView
+from simulation.grass import GrassLayer
+from simulation.collisions import Collisions
+from simulation.profiling import profiled
 
-SHIFTS = np.array([np.array([x, y])
-                   for x in [0, 1]
-                   for y in [0, 1]])
+
+# Result of a neighbour query sorted by distance. Holds the space indices of
+# the neighbours with their distances and headings from the query point and
+# iterates over the agents themselves.
+class Neighbours:
+    __slots__ = ('space', 'idx', 'distances', 'headings', 'species')
+
+    def __init__(self, space, idx, distances, headings, species):
+        self.space = space
+        self.idx = idx
+        self.distances = distances
+        self.headings = headings
+        # species codes of the neighbours, -1 for agents outside the store
+        self.species = species
+
+    def __len__(self):
+        return len(self.idx)
+
+    def __iter__(self):
+        agents = self.space.agents
+        return (agents[idx] for idx in self.idx)
+
+    def select(self, mask):
+        return Neighbours(self.space, self.idx[mask], self.distances[mask], self.headings[mask],
+                          self.species[mask])
+
+    def nearest(self, k=1):
+        return self.select(slice(None, k))
+
+    def of_type(self, *types):
+        mask = self.species == types[0].SPECIES
+        for cls in types[1:]:
+            mask |= self.species == cls.SPECIES
+        return self.select(mask)
+
+    def column(self, name):
+        return getattr(self.space.store, name)[self.space._row_array[self.idx]]
 
 class CachedSpace(space.ContinuousSpace):
-    def __init__(self):
+    def __init__(self, index='grid'):
         self.agents              = []
-        self.not_removed         = []
+        self._not_removed        = np.zeros(0, dtype=bool)
+        self.store               = AgentStore()
+        self._rows               = []
+        self._row_array          = np.zeros(0, dtype=int)
         self.torus               = True
         self.x_min = self.y_min  = 0
         self.x_max = self.y_max  = 1
         self.width = self.height = 1
+        self._index              = INDEXES[index]()
+        self._outdated           = True
+        self._moved              = set()
+        self.counters            = {'rebuilds': 0, 'patches': 0}
+        self._batch              = None
+        self.grass               = GrassLayer(np.zeros((0, 2)))
+        self.collisions          = None
+
+    # flags of the agents not removed since the last rebuild, indexed by _idx
+    @property
+    def not_removed(self):
+        return self._not_removed[:len(self.agents)]
 
     def place_agent(self, agent, pos):
         self._outdated = True
         agent._idx = len(self.agents)
+        if agent._idx == len(self._not_removed):
+            self._not_removed = np.concatenate((self._not_removed, np.zeros(max(16, agent._idx), dtype=bool)))
+        self._not_removed[agent._idx] = True
         self.agents.append(agent)
-        self.not_removed.append(True)
+        self._rows.append(agent._row
+                          if isinstance(agent, StoredView) and agent._store is self.store
+                          else -1)
         agent.pos = pos
 
     def move_agent(self, agent, pos):
-        self._outdated = True
+        if self._batch is not None:
+            self._batch['moves'][agent._idx] = agent, np.array(pos)
+            return
+        self._moved.add(agent._idx)
         agent.pos = pos
 
+    # while a batch is open moves and removals are only recorded, so every
+    # query sees the positions from the moment the batch was started
+    def begin_batch(self):
+        self._batch = {'moves': {}, 'deferred': [], 'claimed': set()}
+
+    # Food eaten during a batch is only removed at commit, so it is claimed
+    # by the first agent to eat it and refused to every later one. Outside
+    # of a batch eaten food is gone at once and every claim succeeds.
+    def claim(self, key):
+        if self._batch is None:
+            return True
+        if key in self._batch['claimed']:
+            return False
+        self._batch['claimed'].add(key)
+        return True
+
+    def defer(self, foo, *args):
+        if self._batch is not None:
+            self._batch['deferred'].append((foo, args))
+        else:
+            foo(*args)
+
+    def commit_batch(self):
+        batch, self._batch = self._batch, None
+        self.collisions = None
+        for agent, pos in batch['moves'].values():
+            self.move_agent(agent, pos)
+        for foo, args in batch['deferred']:
+            foo(*args)
+
+    # mesa's query, timed as part of space.neighbours
     def get_neighbors(self, agent, radius, include_center=True):
+        return iter(self.neighbours(agent, radius, include_center))
+
+    # Neighbours within radius of the agent, or of point when given, nearest
+    # first. k keeps only the k nearest, types only agents of these classes.
+    @profiled('space.neighbours')
+    def neighbours(self, agent, radius, include_center=False, k=None, types=None, point=None):
+        self._update()
+        # the index holds the current positions of all agents
+        positions = self._index.pos
+        point = positions[agent._idx] if point is None else np.asarray(point, dtype=float)
+        idx = self._index.query_point(point, radius)
+        keep = self._not_removed[idx]
+        if not include_center:
+            keep &= idx != agent._idx
+        idx = idx[keep]
+        headings = minimum_image(positions[idx] - point, np.array([self.width, self.height]))
+        distances = np.linalg.norm(headings, axis=-1)
+        order = np.argsort(distances, kind='stable')
+        neighbours = self.neighbours_result(idx[order], distances[order], headings[order])
+        if types is not None:
+            neighbours = neighbours.of_type(*types)
+        return neighbours if k is None else neighbours.nearest(k)
+
+    def neighbours_result(self, idx, distances, headings):
+        rows = self._row_array[idx]
+        species = np.where(rows >= 0, self.store.species[rows], -1)
+        return Neighbours(self, idx, distances, headings, species)
+
+    # Collects the overlaps of the agents at their new_pos at once. Valid until
+    # the batch is committed, so only while the space is frozen by a batch.
+    @profiled('space.detect_collisions')
+    def detect_collisions(self, agents):
         self._update()
-        distances = self._distances[agent._idx]
-        neighbors = (distances <= radius) * self.not_removed
-        neighbors[agent._idx] *= include_center
-        idxs, = np.nonzero(neighbors)
-        return (self.agents[idx] for idx in idxs[np.argsort(neighbors[idxs])])
+        idxs = np.array([agent._idx for agent in agents], dtype=int)
+        points = np.array([agent.new_pos for agent in agents], dtype=float).reshape(-1, 2)
+        radii = np.array([agent.RADIUS for agent in agents], dtype=float)
+        self.collisions = Collisions(self, idxs, points, radii)
+
+    def get_pairs(self, radius, include_center=False):
+        self._update()
+        first, second = self._index.pairs(radius)
+        keep = self._not_removed[first] & self._not_removed[second]
+        if not include_center:
+            keep &= first != second
+        return first[keep], second[keep]
+
+    # minimum-image geometry, positions broadcast against each other, so one
+    # position against an (M, 2) array or (N, 1, 2) against (M, 2) both work
+    def get_headings(self, pos_1, pos_2):
+        return minimum_image(np.asarray(pos_2) - pos_1, np.array([self.width, self.height]))
+
+    @profiled('space.get_distances')
+    def get_distances(self, pos_1, pos_2):
+        return np.linalg.norm(self.get_headings(pos_1, pos_2), axis=-1)
 
     def get_heading(self, pos_1, pos_2):
-        headings = pos_2 - (pos_1 + SHIFTS)
-        lengths  = np.linalg.norm(headings, axis=1)
-        return headings[lengths == lengths.min()][0]
+        return self.get_headings(pos_1, pos_2)
 
-    # combinations for cartesian product
-    lcomb, rcomb = np.meshgrid(range(len(SHIFTS)), range(len(SHIFTS)))
     def get_distance(self, pos_1, pos_2):
-        sp1, sp2 = pos_1 + SHIFTS, pos_2 + SHIFTS
-        headings = (sp1[self.lcomb] - sp2[self.rcomb]).reshape(16,2)
-        lengths  = np.linalg.norm(headings, axis=1)
-        return lengths.min()
+        return self.get_distances(pos_1, pos_2)
 
     def _remove_agent(self, pos, agent):
-        self.not_removed[agent._idx] = False
+        if self._batch is not None:
+            self._batch['deferred'].append((self._remove_agent, (pos, agent)))
+            return
+        self._not_removed[agent._idx] = False
+
+    def reset_counters(self):
+        counters, self.counters = self.counters, {'rebuilds': 0, 'patches': 0}
+        return counters
 
     def _update(self):
         if self._outdated:
-            self._clean_removed()
-
-            pos = np.array([a.pos for a in self.agents])
-            l = len(pos)
-            shifts = pos + SHIFTS.reshape(4,1,2)
-            shifts = shifts.reshape(4*l, 2)
-            self._distances = scipy.spatial.distance.pdist(shifts)
-            self._distances = scipy.spatial.distance.squareform(self._distances)
-            self._distances = self._distances.reshape(4, l, 4, l)
-            self._distances = self._distances.swapaxes(1, 2)
-            self._distances = self._distances.reshape(4*4, l, l)
-            self._distances = self._distances.min(axis=0)
-            self._outdated = False
+            self._rebuild()
+        elif self._moved:
+            self._patch()
+        self._moved.clear()
+
+    @profiled('space.rebuild')
+    def _rebuild(self):
+        self._clean_removed()
+
+        self._index.build(self._positions(np.arange(len(self.agents))))
+        self.counters['rebuilds'] += 1
+        self._outdated = False
+
+    @profiled('space.patch')
+    def _patch(self):
+        idxs = np.fromiter(self._moved, dtype=int, count=len(self._moved))
+        patched = self._index.patch(idxs, self._positions(idxs))
+        self.counters['patches' if patched else 'rebuilds'] += 1
+
+    # stored agents are gathered straight from the store columns
+    def _positions(self, idxs):
+        rows = self._row_array[idxs]
+        if (rows >= 0).all():
+            return self.store.pos[rows]
+        return np.array([self.agents[idx].pos for idx in idxs], dtype=float).reshape(-1, 2)
 
     def _clean_removed(self):
-        tmp         = self.agents
-        self.agents = []
+        tmp, tmp_rows, not_removed = self.agents, self._rows, self.not_removed.tolist()
+        self.agents, self._rows = [], []
 
-        for not_rm, agent in zip(self.not_removed, tmp):
+        for not_rm, agent, row in zip(not_removed, tmp, tmp_rows):
             if not_rm:
                 agent._idx = len(self.agents)
                 self.agents.append(agent)
+                self._rows.append(row)
 
-        self.not_removed = [True] * len(self.agents)
+        self._not_removed = np.ones(len(self.agents), dtype=bool)
+        self._row_array  = np.array(self._rows, dtype=int)
@@ -1,9 +1,10 @@
 from unittest import TestCase, mock
 import numpy as np
 
-from simulation import space
+from simulation import space, boids
 
 class CachedSpaceTest(TestCase):
+    INDEX = 'grid'
     R = 1e-3
     epsilon = 1e-10
     eR = R - epsilon
@@ -17,7 +18,7 @@ class CachedSpaceTest(TestCase):
     DISTANCES     = np.array([eR, eR, np.sqrt(eR*eR/2)]*2)
 
     def setUp(self):
-        self.space = space.CachedSpace()
+        self.space = space.CachedSpace(self.INDEX)
         self.agents = [0, 1]
         for i in range(2):
             self.agents[i] = mock.MagicMock()
@@ -48,6 +49,41 @@ class CachedSpaceTest(TestCase):
                              list(self.space.get_neighbors(self.agents[0], self.R)),
                              'agent in %s should be found' % np.array((x, y)))
 
+    def test_move_patches_index(self):
+        self.space.move_agent(self.agents[0], np.array([0, 0]))
+        self.space.move_agent(self.agents[1], np.array([.5, .5]))
+        list(self.space.get_neighbors(self.agents[0], self.R))
+        self.space.reset_counters()
+
+        self.space.move_agent(self.agents[1], np.array([self.R/2, 0]))
+        self.assertEqual(self.agents,
+                         list(self.space.get_neighbors(self.agents[0], self.R)))
+        self.assertEqual({'rebuilds': 0, 'patches': 1}, self.space.reset_counters())
+
+    def test_place_rebuilds_index(self):
+        list(self.space.get_neighbors(self.agents[0], self.R))
+        self.space.reset_counters()
+
+        self.space.place_agent(mock.MagicMock(), np.random.rand(2))
+        list(self.space.get_neighbors(self.agents[0], self.R))
+        self.assertEqual({'rebuilds': 1, 'patches': 0}, self.space.reset_counters())
+
+    def test_batch_defers_moves_and_removals(self):
+        self.space.move_agent(self.agents[0], np.array([0, 0]))
+        self.space.move_agent(self.agents[1], np.array([.5, .5]))
+
+        self.space.begin_batch()
+        self.space.move_agent(self.agents[1], np.array([self.R/2, 0]))
+        self.space._remove_agent(self.agents[0].pos, self.agents[0])
+        np.testing.assert_array_equal(self.agents[1].pos, [.5, .5])
+        self.assertEqual([self.agents[0]],
+                         list(self.space.get_neighbors(self.agents[0], self.R)))
+
+        self.space.commit_batch()
+        np.testing.assert_array_equal(self.agents[1].pos, [self.R/2, 0])
+        self.assertEqual([self.agents[1]],
+                         list(self.space.get_neighbors(self.agents[1], self.R)))
+
     def test_get_heading(self):
         pos1 = 0, 0
         for pos2, heading in zip(self.AROUND_CENTER, self.HEADINGS):
@@ -66,6 +102,24 @@ class CachedSpaceTest(TestCase):
                     err_msg='from {pos1} to {pos2}'.format(pos1=pos1, pos2=pos2)
                 )
 
+    def test_get_heading_wraps_both_ways(self):
+        np.testing.assert_array_almost_equal([.4, -.4],
+                                             self.space.get_heading((.8, .2), (.2, .8)))
+
+    def test_get_headings_and_distances(self):
+        pos1 = np.random.rand(5, 1, 2)
+        pos2 = np.random.rand(7, 2)
+        headings = self.space.get_headings(pos1, pos2)
+        distances = self.space.get_distances(pos1, pos2)
+        self.assertEqual(headings.shape, (5, 7, 2))
+        for i in range(5):
+            for j in range(7):
+                np.testing.assert_array_almost_equal(headings[i, j],
+                                                     self.space.get_heading(pos1[i, 0], pos2[j]))
+                self.assertAlmostEqual(distances[i, j],
+                                       self.space.get_distance(pos1[i, 0], pos2[j]))
+                self.assertLessEqual(np.abs(headings[i, j]).max(), .5)
+
     def test_torus_adj(self):
         pos = np.random.rand(2)
         shifts = space.SHIFTS + pos
@@ -86,3 +140,41 @@ class CachedSpaceTest(TestCase):
                          list(self.space.get_neighbors(self.agents[0], self.R)),
                          'agent 1 should be removed')
 
+class DenseCachedSpaceTest(CachedSpaceTest):
+    INDEX = 'dense'
+
+class NeighboursTest(TestCase):
+    def setUp(self):
+        self.space = space.CachedSpace()
+        self.center = boids.SheepAgent(np.zeros(7), self.space)
+        self.space.place_agent(self.center, np.array([.5, .5]))
+        self.others = []
+        for i, offset in enumerate([.03, .01, -.02, .05, .2]):
+            agent = (boids.WolfAgent(np.zeros(5), self.space) if i % 2
+                     else boids.SheepAgent(np.zeros(7), self.space))
+            self.space.place_agent(agent, np.array([.5 + offset, .5]))
+            self.others.append(agent)
+
+    def test_sorted_by_distance(self):
+        neighbours = self.space.neighbours(self.center, .1)
+
+        self.assertEqual(list(neighbours), [self.others[i] for i in (1, 2, 0, 3)])
+        np.testing.assert_array_almost_equal(neighbours.distances, [.01, .02, .03, .05])
+        np.testing.assert_array_almost_equal(neighbours.headings, [[.01, 0], [-.02, 0], [.03, 0], [.05, 0]])
+
+    def test_k_nearest_and_types(self):
+        self.assertEqual(list(self.space.neighbours(self.center, .1, k=2)), [self.others[1], self.others[2]])
+        self.assertEqual(list(self.space.neighbours(self.center, .1, types=[boids.SheepAgent])),
+                         [self.others[2], self.others[0]])
+        self.assertEqual(list(self.space.neighbours(self.center, .1, include_center=True, k=1)), [self.center])
+
+    def test_around_point(self):
+        neighbours = self.space.neighbours(self.center, .015, point=[.519, .5])
+        self.assertEqual(list(neighbours), [self.others[1], self.others[0]])
+        np.testing.assert_array_almost_equal(neighbours.distances, [.009, .011])
+
+    def test_columns(self):
+        self.others[1].heading = [0, 1]
+        nearest = self.space.neighbours(self.center, .1, k=1)
+        np.testing.assert_array_equal(nearest.column('heading'), [[0, 1]])
+        np.testing.assert_array_equal(nearest.species, [boids.WOLF])
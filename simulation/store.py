@@ -0,0 +1,69 @@
+import numpy as np
+
+
+MAX_GENES = 7
+
+class AgentStore:
+    COLUMNS = {
+        'pos':     ((2,),        float),
+        'heading': ((2,),        float),
+        'new_pos': ((2,),        float),
+        'energy':  ((),          float),
+        'eaten':   ((),          int),
+        'draw':    ((),          float),
+        'cost':    ((),          float),
+        'survived': ((),         int),
+        'species': ((),          np.int8),
+        'genes':   ((MAX_GENES,), float),
+    }
+
+    def __init__(self, capacity=256):
+        self.size = 0
+        for name, (shape, dtype) in self.COLUMNS.items():
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+    def add(self, species):
+        if self.size == len(self.species):
+            self._grow()
+        row, self.size = self.size, self.size + 1
+        self.species[row] = species
+        return row
+
+    def _grow(self):
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros((2 * len(old),) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+def column(name):
+    def getter(self):
+        return getattr(self._store, name)[self._row]
+
+    def setter(self, value):
+        getattr(self._store, name)[self._row] = value
+
+    return property(getter, setter)
+
+def gene(i):
+    def getter(self):
+        return self._store.genes[self._row, i]
+
+    def setter(self, value):
+        self._store.genes[self._row, i] = value
+
+    return property(getter, setter)
+
+def gene_columns(count):
+    return tuple(gene(i) for i in range(count))
+
+# agent state lives in the store, objects only remember their row
+class StoredView:
+    __slots__ = ('_store', '_row', '__weakref__')
+    SPECIES = -1
+
+    def __init__(self, store):
+        self._store = store
+        self._row = store.add(self.SPECIES)
+
+    pos = column('pos')
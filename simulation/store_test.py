@@ -0,0 +1,47 @@
+from unittest import TestCase
+import numpy as np
+
+from simulation import store, space, boids
+
+class AgentStoreTest(TestCase):
+    def setUp(self):
+        self.store = store.AgentStore(capacity=2)
+
+    def test_add_grows_columns(self):
+        rows = [self.store.add(species) for species in range(5)]
+        self.assertEqual(rows, list(range(5)))
+        self.assertEqual(self.store.size, 5)
+        self.assertGreaterEqual(len(self.store.pos), 5)
+        np.testing.assert_array_equal(self.store.species[:5], range(5))
+
+    def test_growing_keeps_values(self):
+        row = self.store.add(0)
+        self.store.energy[row] = 42
+        for _ in range(10):
+            self.store.add(1)
+        self.assertEqual(self.store.energy[row], 42)
+
+class StoredAgentTest(TestCase):
+    def setUp(self):
+        self.space = space.CachedSpace()
+        self.genes = np.linspace(0, 1, 7)
+        self.sheep = boids.SheepAgent(self.genes, self.space)
+
+    def test_state_lives_in_store(self):
+        self.space.place_agent(self.sheep, np.array([.1, .2]))
+        self.sheep.heading = np.array([1., 0.])
+        self.sheep.energy -= 5
+        row = self.sheep._row
+
+        np.testing.assert_array_equal(self.space.store.pos[row], [.1, .2])
+        np.testing.assert_array_equal(self.space.store.heading[row], [1, 0])
+        self.assertEqual(self.space.store.energy[row], boids.MAX_ENERGY - 5)
+        self.assertEqual(self.space.store.species[row], boids.SHEEP)
+
+    def test_genes_round_trip(self):
+        np.testing.assert_array_almost_equal(self.sheep.extract_genes(), self.genes)
+        self.assertEqual(self.sheep.fear_speed, self.genes[4])
+
+    def test_agents_have_no_dict(self):
+        self.assertFalse(hasattr(self.sheep, '__dict__'))
+        self.assertFalse(hasattr(boids.WolfAgent(self.genes[:5], self.space), '__dict__'))
@@ -0,0 +1,127 @@
+import os
+import json
+
+import mesa.model
+import numpy as np
+from numpy.lib.format import open_memmap
+
+
+# state of every agent of a run at one step, rows follow Model.population
+class Frame:
+    def __init__(self, step, pos, heading, energy, alive, species, grass_pos, grass_available):
+        self.step = step
+        self.pos = pos
+        self.heading = heading
+        self.energy = energy
+        self.alive = alive
+        self.species = species
+        self.grass_pos = grass_pos
+        self.grass_available = grass_available
+
+def capture(model):
+    store, rows, grass = model.space.store, model.rows, model.space.grass
+    energy = store.energy[rows]
+    return Frame(model.iter, store.pos[rows], store.heading[rows], energy, energy > 0,
+                 store.species[rows], grass.pos, grass.available)
+
+AGENT = np.dtype([
+    ('pos',     np.float32, (2,)),
+    ('heading', np.float32, (2,)),
+    ('energy',  np.float32),
+    ('alive',   bool),
+])
+
+AGENTS_FILE = 'agents.npy'
+GRASS_FILE  = 'grass.npy'
+STATIC_FILE = 'static.npz'
+META_FILE   = 'meta.json'
+
+# Writes one record per agent and frame into memory-mapped arrays of a
+# directory, frame 0 is the initial placement. meta.json tells how many
+# frames are on disk, so an interrupted recording can still be replayed,
+# and whether the recording was closed at the end of the run.
+class TrajectoryRecorder:
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self.frames = 0
+        self.complete = False
+
+    def start(self, model):
+        os.makedirs(self.path, exist_ok=True)
+        frame = capture(model)
+        capacity = model.steps + 2
+        self.agents = open_memmap(os.path.join(self.path, AGENTS_FILE), 'w+', AGENT, (capacity, len(frame.pos)))
+        self.grass = open_memmap(os.path.join(self.path, GRASS_FILE), 'w+', bool,
+                                 (capacity, len(frame.grass_pos)))
+        np.savez(os.path.join(self.path, STATIC_FILE), species=frame.species, grass_pos=frame.grass_pos)
+        self.record(model)
+        self.flush()
+
+    def record(self, model):
+        frame = capture(model)
+        row = self.agents[self.frames]
+        row['pos'], row['heading'] = frame.pos, frame.heading
+        row['energy'], row['alive'] = frame.energy, frame.alive
+        self.grass[self.frames] = frame.grass_available
+        self.frames += 1
+        if self.frames % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        self.agents.flush()
+        self.grass.flush()
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump({'frames': self.frames, 'complete': self.complete}, f)
+
+    def close(self):
+        self.complete = True
+        self.flush()
+
+def is_complete(path):
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            return json.load(f).get('complete', False)
+    except FileNotFoundError:
+        return False
+
+# read side of a recording, frames are views of the memory map
+class Trajectory:
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.frames, self.complete = meta['frames'], meta.get('complete', False)
+        self.agents = np.load(os.path.join(path, AGENTS_FILE), mmap_mode='r')
+        self.grass = np.load(os.path.join(path, GRASS_FILE), mmap_mode='r')
+        with np.load(os.path.join(path, STATIC_FILE)) as static:
+            self.species, self.grass_pos = static['species'], static['grass_pos']
+
+    def __len__(self):
+        return self.frames
+
+    def frame(self, step):
+        agents = self.agents[step]
+        return Frame(step, agents['pos'], agents['heading'], agents['energy'], agents['alive'],
+                     self.species, self.grass_pos, self.grass[step])
+
+# Plays a recording back in place of Model, e.g. in a ModularServer. Every
+# step moves stride frames forward, start seeks to a frame on reset.
+class ReplayModel(mesa.model.Model):
+    def __init__(self, path, start=0, stride=1):
+        super(ReplayModel, self).__init__()
+        self.trajectory = Trajectory(path)
+        self.stride = max(1, int(stride))
+        self._frame = None
+        self.seek(start)
+
+    def seek(self, step):
+        self.iter = int(np.clip(step, 0, len(self.trajectory) - 1))
+        self.running = self.iter < len(self.trajectory) - 1
+
+    def step(self):
+        self.seek(self.iter + self.stride)
+
+    def frame(self):
+        if self._frame is None or self._frame.step != self.iter:
+            self._frame = self.trajectory.frame(self.iter)
+        return self._frame
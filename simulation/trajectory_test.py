@@ -0,0 +1,74 @@
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from simulation.environment import Environment
+from simulation.trajectory import TrajectoryRecorder, Trajectory, ReplayModel, is_complete
+from simulation.visualization.widgets.minimap import VerySimpleCanvas
+from simulation.visualization.widgets.histogram import Histogram
+
+import gen.toolboxes as tbx
+
+
+def assert_frames_equal(frame, other):
+    for name in ('pos', 'heading', 'energy'):
+        np.testing.assert_allclose(getattr(frame, name), getattr(other, name), rtol=1e-6, atol=1e-6)
+    for name in ('step', 'alive', 'species', 'grass_available'):
+        np.testing.assert_array_equal(getattr(frame, name), getattr(other, name))
+
+class TrajectoryTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+        species = tbx.sheep(8).population(), tbx.wolves(3).population()
+        self.model = Environment(6, regrowth=2).prepare_model(species, 42, TrajectoryRecorder(self.path))
+        self.frames = [self.model.frame()]
+        while self.model.running:
+            self.model.step()
+            self.frames.append(self.model.frame())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replays_recorded_frames(self):
+        trajectory = Trajectory(self.path)
+        self.assertEqual(len(trajectory), len(self.frames))
+        for step, frame in enumerate(self.frames):
+            assert_frames_equal(trajectory.frame(step), frame)
+
+    def test_seek_and_stride(self):
+        replay = ReplayModel(self.path, start=2, stride=3)
+        self.assertEqual(replay.frame().step, 2)
+        replay.step()
+        self.assertEqual((replay.iter, replay.running), (5, True))
+        replay.step()
+        self.assertEqual((replay.iter, replay.running), (len(self.frames) - 1, False))
+        self.assertEqual(ReplayModel(self.path, start=1000).iter, len(self.frames) - 1)
+
+    def test_interrupted_recording(self):
+        species = tbx.sheep(2).population(), tbx.wolves(1).population()
+        with tempfile.TemporaryDirectory() as path:
+            model = Environment(50).prepare_model(species, 1, TrajectoryRecorder(path, flush_every=2))
+            for _ in range(5):
+                model.step()
+            self.assertEqual(len(Trajectory(path)), 6)
+            self.assertFalse(is_complete(path))
+
+    def test_readable_from_first_frame(self):
+        species = tbx.sheep(2).population(), tbx.wolves(1).population()
+        with tempfile.TemporaryDirectory() as path:
+            Environment(50).prepare_model(species, 1, TrajectoryRecorder(path))
+            self.assertEqual(len(Trajectory(path)), 1)
+            self.assertFalse(Trajectory(path).complete)
+
+    def test_finished_recording_is_complete(self):
+        self.assertTrue(is_complete(self.path))
+        self.assertTrue(Trajectory(self.path).complete)
+
+    def test_widgets_render_replays_like_models(self):
+        replay = ReplayModel(self.path, start=len(self.frames) - 1)
+        histogram = Histogram(list(range(0, 201, 20)), 200, 500)
+        self.assertEqual(histogram.render(replay), histogram.render(self.model))
+        canvas, replayed = VerySimpleCanvas(), VerySimpleCanvas().render(replay)
+        self.assertEqual(canvas.render(self.model), replayed)
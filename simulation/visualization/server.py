@@ -1,33 +1,61 @@
+import os
+import sys
+import argparse
+
 from mesa.visualization.ModularVisualization import ModularServer
+from mesa.visualization.UserParam import Slider, NumberInput
 
 from simulation.visualization.widgets.minimap import VerySimpleCanvas
 from simulation.visualization.widgets.histogram import Histogram
-from simulation.visualization.widgets.text import VerySimpleText
-from simulation.environment import Model, create_population
+from simulation.environment import Environment
+from simulation.trajectory import TrajectoryRecorder, ReplayModel, is_complete
 
 import gen.toolboxes # required to register necesary types
 from gen.checkpoints import CheckpointManager
 
 
-agent_canvas = VerySimpleCanvas(lambda _: {})
-
-# histogram = Histogram(list(range(4)), 200, 500, lambda sheep: sheep.strategy.decision)
-histogram2 = Histogram(list(range(1, 202)), 200, 500, lambda sheep: sheep.energy)
-
-def reset_model(species, seed):
-    model = Model(seed, 2000)
-    population = create_population(*species, model.space)
-    model.add_population(population)
-
-    return model
-
-experiment_path = r'C:\Users\mwawrzos\dev\DarwinLamarck2\checkpoints\2018_05_27_11_49_34'
-epoch = 0
-population, seed = CheckpointManager(experiment_path).load_epoch(epoch)
-
-server = ModularServer(reset_model,
-                       [agent_canvas, histogram2],
-                       "Simulation",
-                       {'seed': seed,
-                        'species': population})
-server.launch()
\ No newline at end of file
+def elements():
+    return [VerySimpleCanvas(), Histogram(list(range(1, 202)), 200, 500, 'energy')]
+
+def record(species, seed, steps, path):
+    model = Environment(steps).prepare_model(species, seed, TrajectoryRecorder(path))
+    model.run_model()
+
+def live_server(species, seed, steps):
+    def reset_model(species, seed):
+        return Environment(steps).prepare_model(species, seed)
+    return ModularServer(reset_model, elements(), 'Simulation', {'seed': seed, 'species': species})
+
+def replay_server(path, frames):
+    return ModularServer(ReplayModel, elements(), 'Replay',
+                         {'path':   path,
+                          'start':  Slider('start frame', 0, 0, frames - 1),
+                          'stride': NumberInput('frames per step', 1)})
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Shows the simulation of a checkpointed epoch.')
+    parser.add_argument('checkpoint', help='checkpoint directory of an experiment')
+    parser.add_argument('--epoch', type=int, default=0)
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--trajectory', help='recording to replay, made from the epoch when missing '
+                                             '(default: <checkpoint>/<epoch>.trajectory)')
+    parser.add_argument('--live', action='store_true', help='simulate while drawing instead of replaying')
+    parser.add_argument('--port', type=int)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    species, seed = CheckpointManager(options.checkpoint).load_epoch(options.epoch)
+
+    if options.live:
+        server = live_server(species, seed, options.steps)
+    else:
+        path = options.trajectory or os.path.join(options.checkpoint, '%d.trajectory' % options.epoch)
+        # an interrupted recording is made again from the start
+        if not is_complete(path):
+            record(species, seed, options.steps, path)
+        server = replay_server(path, len(ReplayModel(path).trajectory))
+    server.launch(options.port)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -44,8 +44,9 @@ var HistogramModule = function(bins, canvas_width, canvas_height) {
     var chart = new Chart(context).Bar(data, options);
 
     //noinspection JSUnusedGlobalSymbols
-    this.render = function (data) {
-        for (var i in data) { //noinspection JSUnfilteredForInLoop
+    this.render = function (packed) {
+        var data = decodeArray(packed);
+        for (var i = 0; i < data.length; i++) {
             chart.datasets[0].bars[i].value = data[i];
         }
         chart.update();
@@ -1,26 +1,31 @@
 import numpy as np
 from mesa.visualization.ModularVisualization import VisualizationElement
 
-from simulation.boids import SheepAgent, filter_by_type
+from simulation.boids import SHEEP
+from simulation.visualization.widgets.packing import pack
 
+# histogram of a column of model.frame() over the living agents of a specie,
+# bin counts are sent as a packed typed array
 class Histogram(VisualizationElement):
     package_includes = ['Chart.min.js']
-    local_includes = ['simulation/visualization/widgets/histogram.js']
+    local_includes = ['simulation/visualization/widgets/packing.js',
+                      'simulation/visualization/widgets/histogram.js']
 
-    def __init__(self, bins, canvas_height, canvas_width, getter):
+    def __init__(self, bins, canvas_height, canvas_width, column='energy', species=SHEEP):
         super().__init__()
         self.canvas_height = canvas_height
         self.canvas_width = canvas_width
         self.bins = bins
-        new_element = "new Histogram({}, {}, {})"
+        new_element = "new HistogramModule({}, {}, {})"
         new_element = new_element.format(bins,
                                          canvas_width,
                                          canvas_height)
         self.js_code = "elements.push(" + new_element + ");"
-        self.getter = getter
+        self.column = column
+        self.species = species
 
     def render(self, model):
-        sheep = filter_by_type(model.schedule.agents, SheepAgent) # filter(t_matcher(SheepAgent), model.schedule.agents)
-        wealth_values = list(map(self.getter, sheep))
-        hist = np.histogram(wealth_values, bins=self.bins)[0]
-        return [int(x) for x in hist]
+        frame = model.frame()
+        values = getattr(frame, self.column)[frame.alive & (frame.species == self.species)]
+        hist = np.histogram(values, bins=self.bins)[0]
+        return pack(hist, np.uint32)
@@ -4,12 +4,25 @@
  */
 
 var AgentVisualization = function (width, height, context) {
-    this.draw = function (objects) {
-        for (var i = 0; i < objects.length; i++) {
-            var p = objects[i];
-            this.drawCircle(p.x, p.y, p.r, p.Color, true);   // agent
-            this.drawCircle(p.x, p.y, p.rs, 'green', false); // sight
-            this.drawVector(p.x, p.y, p.vx, p.vy, p.v2x, p.v2y);           // vector
+    this.draw = function (frame) {
+        var scale = frame.scale;
+        for (var i = 0; i < frame.grassCount; i++) {
+            if (!bitAt(frame.grass, i))
+                continue;
+            this.drawCircle(frame.grassPos[2*i] / scale, frame.grassPos[2*i + 1] / scale,
+                            frame.grassKind.r, frame.grassKind.color, true);
+        }
+        for (i = 0; i < frame.count; i++) {
+            if (!bitAt(frame.alive, i))
+                continue;
+            var kind = frame.kinds[frame.species[i]];
+            var x = frame.pos[2*i] / scale;
+            var y = frame.pos[2*i + 1] / scale;
+            var vx = x + frame.heading[2*i] / 127;
+            var vy = y + frame.heading[2*i + 1] / 127;
+            this.drawCircle(x, y, kind.r, kind.color, true);   // agent
+            this.drawCircle(x, y, kind.rs, 'green', false);    // sight
+            this.drawVector(x, y, vx, vy, vx, vy);             // vector
         }
     };
     
@@ -66,14 +79,50 @@ var VerySimpleContinuousModule = function (canvas_width, canvas_height) {
     var context = canvas.getContext("2d");
     var canvasDraw = new AgentVisualization(canvas_width, canvas_height, context);
 
+    // state of the last frame, which delta frames are applied to
+    var frame = null;
+
+    // false for a delta frame which does not apply to the frame held, e.g.
+    // in a second tab or after a reconnect, until the next keyframe
+    this.update = function (data) {
+        if (!data.key && (frame === null || frame.step !== data.base)) {
+            frame = null;
+            return false;
+        }
+        if (data.key) {
+            frame = {
+                scale: data.scale,
+                count: data.count,
+                pos: decodeArray(data.pos),
+                species: decodeArray(data.species),
+                grassPos: decodeArray(data.grass_pos),
+                kinds: data.kinds,
+                grassKind: data.grass_kind
+            };
+            frame.grassCount = frame.grassPos.length / 2;
+        } else {
+            var delta = decodeArray(data.delta);
+            for (var i = 0; i < delta.length; i++)
+                frame.pos[i] = (frame.pos[i] + delta[i]) & (frame.scale - 1);
+        }
+        frame.step = data.step;
+        frame.heading = decodeArray(data.heading);
+        frame.alive = decodeArray(data.alive);
+        frame.grass = decodeArray(data.grass);
+        return true;
+    };
+
     //noinspection JSUnusedGlobalSymbols
     this.render = function (data) {
+        var ready = this.update(data);
         canvasDraw.resetCanvas();
-        canvasDraw.draw(data);
+        if (ready)
+            canvasDraw.draw(frame);
     };
 
     //noinspection JSUnusedGlobalSymbols
     this.reset = function () {
+        frame = null;
         canvasDraw.resetCanvas();
     };
 };
@@ -1,45 +1,33 @@
 from mesa.visualization.ModularVisualization import VisualizationElement
 
-from simulation.boids import Agent
+from simulation.boids import SheepAgent, WolfAgent
+from simulation.grass import GrassLayer
+from simulation.visualization.widgets.packing import FrameEncoder
 
+# drawing properties by species code, sent with keyframes
+KINDS = {str(cls.SPECIES): {'color': cls.COLOR, 'r': cls.RADIUS, 'rs': cls.VIEW_RANGE}
+         for cls in (SheepAgent, WolfAgent)}
+GRASS = {'color': GrassLayer.COLOR, 'r': GrassLayer.RADIUS}
 
+
+# draws model.frame(), so live models and replays render the same way,
+# frames are packed by FrameEncoder and unpacked by minimap.js
 class VerySimpleCanvas(VisualizationElement):
-    local_includes = ['simulation/visualization/widgets/minimap.js']
+    local_includes = ['simulation/visualization/widgets/packing.js',
+                      'simulation/visualization/widgets/minimap.js']
 
-    def __init__(self, portrayal_method, canvas_width=500, canvas_height=500):
+    def __init__(self, portrayal_method=None, canvas_width=500, canvas_height=500, delta=True):
         super().__init__()
         self.portrayal_method = portrayal_method
         self.canvas_width = canvas_width
         self.canvas_height = canvas_height
+        self.encoder = FrameEncoder(delta)
 
         new_elements = 'new VerySimpleContinuousModule(%s, %s)' % (self.canvas_width, self.canvas_height)
         self.js_code = 'elements.push(%s);' % new_elements
 
     def render(self, model):
-        space_state = []
-        for i, obj in enumerate(model.space.agents):
-            x, y, = obj.pos
-            x, y = x, y
-            if isinstance(obj, Agent):
-                vx, vy = obj.pos + obj.heading
-                vx, vy = vx, vy
-                v2x, v2y = obj.pos + obj.heading
-                v2x, v2y = v2x, v2y
-            else:
-                vx, vy = x, y
-                v2x, v2y = x, y
-            portrayal = {
-                'Color': obj.COLOR,
-                'x': x,
-                'y': y,
-                'vx': vx,
-                'vy': vy,
-                'v2x': v2x,
-                'v2y': v2y,
-                'r': obj.RADIUS
-            }
-            if hasattr(obj, 'VIEW_RANGE'):
-                portrayal['rs'] = obj.VIEW_RANGE
-            if i == 0: print(i, portrayal)
-            space_state.append(portrayal)
-        return space_state
+        message = self.encoder.encode(model)
+        if message['key']:
+            message.update(kinds=KINDS, grass_kind=GRASS)
+        return message
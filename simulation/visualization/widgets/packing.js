@@ -0,0 +1,17 @@
+/**
+ * Decoding of arrays packed by simulation/visualization/widgets/packing.py
+ */
+
+//noinspection JSUnusedGlobalSymbols
+var decodeArray = function (packed) {
+    var binary = atob(packed.data);
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++)
+        bytes[i] = binary.charCodeAt(i);
+    return new window[packed.type](bytes.buffer);
+};
+
+//noinspection JSUnusedGlobalSymbols
+var bitAt = function (bits, i) {
+    return (bits[i >> 3] >> (i & 7)) & 1;
+};
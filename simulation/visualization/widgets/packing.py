@@ -0,0 +1,77 @@
+import base64
+
+import numpy as np
+
+
+# JavaScript typed array constructors by numpy kind and item size
+TYPED_ARRAYS = {
+    ('u', 1): 'Uint8Array',
+    ('i', 1): 'Int8Array',
+    ('u', 2): 'Uint16Array',
+    ('i', 2): 'Int16Array',
+    ('u', 4): 'Uint32Array',
+    ('i', 4): 'Int32Array',
+    ('f', 4): 'Float32Array',
+    ('f', 8): 'Float64Array',
+}
+
+# little endian bytes as base64, decoded by decodeArray of packing.js
+def pack(array, dtype):
+    dtype = np.dtype(dtype).newbyteorder('<')
+    array = np.ascontiguousarray(array, dtype=dtype)
+    return {'type': TYPED_ARRAYS[dtype.kind, dtype.itemsize],
+            'data': base64.b64encode(array.tobytes()).decode('ascii')}
+
+# one bit per element, element i is bit i % 8 of byte i // 8
+def pack_bits(mask):
+    return pack(np.packbits(np.asarray(mask, dtype=bool), bitorder='little'), np.uint8)
+
+def quantize(pos, scale):
+    return (np.floor(np.asarray(pos) * scale).astype(np.int64) % scale).astype(np.uint16)
+
+# Frames of model.frame() for the minimap. Positions are quantized to
+# 1/scale of the space, scale being a power of two up to 2 ** 16, and after
+# a keyframe are sent as wrapped differences from the previous frame, which
+# fit a byte at usual speeds. Static columns are only part of keyframes.
+# The encoder is shared by every client of the server, so a delta names the
+# step it applies to as base and clients holding another frame skip it until
+# the next keyframe. One is forced every keyframes frames and whenever the
+# model is replaced or does not step forward.
+class FrameEncoder:
+    def __init__(self, delta=True, scale=1 << 12, keyframes=100):
+        self.delta = delta
+        self.scale = scale
+        self.keyframes = keyframes
+        self.model = None
+        self.step = None
+        self.positions = None
+        self.sent = 0
+
+    def keyframe(self, model, frame, positions):
+        return (not self.delta or model is not self.model or self.step is None or frame.step <= self.step
+                or len(positions) != len(self.positions) or self.sent % self.keyframes == 0)
+
+    def encode(self, model):
+        frame = model.frame()
+        positions = quantize(frame.pos, self.scale)
+        key = self.keyframe(model, frame, positions)
+        message = {
+            'step':    int(frame.step),
+            'key':     key,
+            'count':   len(positions),
+            'heading': pack(np.clip(np.round(frame.heading * 127), -127, 127), np.int8),
+            'alive':   pack_bits(frame.alive),
+            'grass':   pack_bits(frame.grass_available),
+        }
+        if key:
+            message.update(scale=self.scale, pos=pack(positions, np.uint16),
+                           species=pack(frame.species, np.int8),
+                           grass_pos=pack(quantize(frame.grass_pos, self.scale), np.uint16))
+        else:
+            delta = (positions.astype(np.int32) - self.positions + self.scale // 2) % self.scale - self.scale // 2
+            small = not len(delta) or np.abs(delta).max() <= 127
+            message.update(base=int(self.step), delta=pack(delta, np.int8 if small else np.int16))
+
+        self.model, self.step, self.positions = model, frame.step, positions
+        self.sent += 1
+        return message
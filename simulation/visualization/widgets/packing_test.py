@@ -0,0 +1,71 @@
+import base64
+from unittest import TestCase
+
+import numpy as np
+
+from simulation.environment import Environment
+from simulation.visualization.widgets.packing import pack, pack_bits, quantize, FrameEncoder
+
+import gen.toolboxes as tbx
+
+NUMPY_TYPES = {'Uint8Array': '<u1', 'Int8Array': '<i1', 'Uint16Array': '<u2', 'Int16Array': '<i2',
+               'Uint32Array': '<u4', 'Float32Array': '<f4'}
+
+def unpack(packed):
+    return np.frombuffer(base64.b64decode(packed['data']), dtype=NUMPY_TYPES[packed['type']])
+
+def unpack_bits(packed, count):
+    return np.unpackbits(unpack(packed), bitorder='little')[:count].astype(bool)
+
+class PackingTest(TestCase):
+    def test_pack(self):
+        array = np.array([[1.5, -2], [3, 4]])
+        np.testing.assert_array_equal(unpack(pack(array, np.float32)), array.ravel())
+        self.assertEqual(pack(array, np.int16)['type'], 'Int16Array')
+
+    def test_pack_bits(self):
+        mask = np.random.rand(13) > .5
+        np.testing.assert_array_equal(unpack_bits(pack_bits(mask), 13), mask)
+
+    def test_quantize_wraps(self):
+        np.testing.assert_array_equal(quantize([0, .5, .999, 1.], 16), [0, 8, 15, 0])
+
+class FrameEncoderTest(TestCase):
+    def setUp(self):
+        species = tbx.sheep(20).population(), tbx.wolves(5).population()
+        self.model = Environment(10).prepare_model(species, 42)
+
+    def decode(self, messages):
+        positions = None
+        for message in messages:
+            if message['key']:
+                positions = unpack(message['pos']).astype(int)
+            else:
+                positions = (positions + unpack(message['delta'])) % message.get('scale', 1 << 12)
+        return positions
+
+    def test_deltas_rebuild_positions(self):
+        encoder, messages = FrameEncoder(), []
+        for _ in range(5):
+            self.model.step()
+            messages.append(encoder.encode(self.model))
+        self.assertEqual([message['key'] for message in messages], [True] + [False] * 4)
+        self.assertEqual({message['delta']['type'] for message in messages[1:]}, {'Int8Array'})
+        self.assertEqual([message['base'] for message in messages[1:]],
+                         [message['step'] for message in messages[:-1]])
+
+        frame, message = self.model.frame(), messages[-1]
+        np.testing.assert_array_equal(self.decode(messages), quantize(frame.pos, 1 << 12).ravel())
+        np.testing.assert_array_equal(unpack_bits(message['alive'], message['count']), frame.alive)
+
+    def test_keyframes(self):
+        encoder = FrameEncoder(keyframes=3)
+        keys = []
+        for _ in range(4):
+            keys.append(encoder.encode(self.model)['key'])
+            self.model.step()
+        keys.append(encoder.encode(self.model)['key'])
+        other = Environment(10).prepare_model((tbx.sheep(2).population(), []), 1)
+        keys.append(encoder.encode(other)['key'])
+        self.assertEqual(keys, [True, False, False, True, False, True])
+        self.assertTrue(FrameEncoder(delta=False).encode(self.model)['key'])
@@ -0,0 +1,197 @@
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+import itertools
+import concurrent.futures
+
+try:
+    import resource
+except ImportError: # not available on Windows, limits are skipped
+    resource = None
+
+import gen.toolboxes as t
+from experiment import Experiment
+from gen.logging import read_stats
+from gen.writer import durable_write
+
+
+# parameters of a run, every one of them may be swept
+DEFAULTS = {
+    'sheep':       100,
+    'wolves':      30,
+    'sheep_mode':  'darwinian',
+    'wolves_mode': 'lamarckian',
+    'vectorized':  False,
+    'cxpb':        .5,
+    'mutpb':       .1,
+    'epochs':      50,
+    'steps':       500,
+    'regrowth':    None,
+    'seed':        0,
+}
+
+MODES = {
+    'darwinian':  t.darwinian,
+    'lamarckian': t.lamarckian,
+}
+
+CONFIG_FILE = 'config.json'
+DONE_FILE   = 'done.json'
+TABLE_FILE  = 'results.csv'
+
+# A spec is a list of configurations or a dict of base parameters, a grid
+# of parameter -> values expanded to every combination and a list of runs.
+# Grid points and runs are both applied on top of the base.
+def expand(spec):
+    if isinstance(spec, list):
+        spec = {'runs': spec}
+    unknown = set(spec) - {'base', 'grid', 'runs'}
+    if unknown:
+        raise ValueError('unknown sweep keys: %s' % ', '.join(sorted(unknown)))
+
+    base = dict(DEFAULTS, **spec.get('base', {}))
+    grid = spec.get('grid', {})
+    points = [dict(zip(grid, values)) for values in itertools.product(*grid.values())] if grid else []
+    configs = [dict(base, **point) for point in points + list(spec.get('runs', []))]
+    if not configs:
+        configs = [base]
+
+    for config in configs:
+        unknown = set(config) - set(DEFAULTS)
+        if unknown:
+            raise ValueError('unknown parameters: %s' % ', '.join(sorted(unknown)))
+        for name in 'sheep_mode', 'wolves_mode':
+            if config[name] not in MODES:
+                raise ValueError('unknown %s: %r, expected one of %s' % (name, config[name], ', '.join(MODES)))
+    return configs
+
+# runs are named by their configuration, so an edited spec still finds them
+def run_name(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+def toolbox(config):
+    def specie(name, factory):
+        return MODES[config[name + '_mode']](factory(config[name], config['vectorized'],
+                                                     cxpb=config['cxpb'], mutpb=config['mutpb']))
+    return t.environment(specie('sheep', t.sheep), specie('wolves', t.wolves))
+
+# stats of the last generation, e.g. {'sheep.max': 12.0, ...}
+def last_generation(directory):
+    columns = read_stats(os.path.join(directory, 'summary.jsonl'))
+    return {key: values[-1].item() if hasattr(values[-1], 'item') else values[-1]
+            for key, values in columns.items() if key != 'gen'}
+
+def limit_resources(memory=None, nice=0):
+    if resource is not None and memory is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory * 2 ** 20, memory * 2 ** 20))
+    if nice and hasattr(os, 'nice'):
+        os.nice(nice)
+
+# worker side, failures are returned so one bad run does not stop the sweep
+def execute(config, directory):
+    start = time.perf_counter()
+    try:
+        with Experiment(toolbox(config), epochs=config['epochs'], checkpoint=directory, steps=config['steps'],
+                        seed=config['seed'], regrowth=config['regrowth'], history=1) as experiment:
+            experiment.run()
+        results = dict(last_generation(directory), seconds=time.perf_counter() - start)
+    except Exception as error:
+        return {'error': repr(error)}
+
+    durable_write(os.path.join(directory, DONE_FILE), lambda f: json.dump(results, f), 'w')
+    return results
+
+def load_done(directory):
+    path = os.path.join(directory, DONE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def write_table(path, rows):
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    durable_write(path, lambda f: write_rows(f, columns, rows), 'w')
+
+def write_rows(f, columns, rows):
+    writer = csv.DictWriter(f, columns)
+    writer.writeheader()
+    writer.writerows(rows)
+
+# Runs every configuration of the spec as an independent Experiment in its
+# own checkpoint directory, on a pool of processes which are replaced after
+# every run. Runs with a done marker are skipped and unfinished ones resume
+# from their checkpoints. The table is rewritten whenever a run finishes.
+# A worker killed outright, e.g. past its memory limit, breaks the pool, so
+# the runs left are reported as failed and resume with the next sweep.
+class Sweep:
+    def __init__(self, spec, directory, processes=None, memory=None, nice=0, out=sys.stdout):
+        self.configs = expand(spec)
+        self.directory = directory
+        self.processes = processes
+        self.memory = memory
+        self.nice = nice
+        self.out = out
+
+    def run(self):
+        rows, pending = {}, []
+        for config in self.configs:
+            name = run_name(config)
+            directory = os.path.join(self.directory, name)
+            os.makedirs(directory, exist_ok=True)
+            durable_write(os.path.join(directory, CONFIG_FILE), lambda f: json.dump(config, f, indent=1), 'w')
+            done = load_done(directory)
+            if done is None:
+                pending.append((name, config, directory))
+            else:
+                rows[name] = self.row(name, config, done)
+        self.out.write('%d runs, %d done, %d to run\n' % (len(self.configs), len(rows), len(pending)))
+        self.write(rows)
+
+        if pending:
+            with concurrent.futures.ProcessPoolExecutor(self.processes, initializer=limit_resources,
+                                                        initargs=(self.memory, self.nice),
+                                                        max_tasks_per_child=1) as pool:
+                jobs = [(name, config, pool.submit(execute, config, directory))
+                        for name, config, directory in pending]
+                for name, config, job in jobs:
+                    try:
+                        results = job.result()
+                    except concurrent.futures.process.BrokenProcessPool as error:
+                        results = {'error': repr(error)}
+                    rows[name] = self.row(name, config, results)
+                    self.out.write('%s %s\n' % (name, 'failed: %s' % results['error'] if 'error' in results
+                                                else 'done in %.1fs' % results['seconds']))
+                    self.out.flush()
+                    self.write(rows)
+        return [rows[run_name(config)] for config in self.configs]
+
+    def row(self, name, config, results):
+        return dict(run=name, **config, **results)
+
+    def write(self, rows):
+        ordered = [rows[name] for name in map(run_name, self.configs) if name in rows]
+        write_table(os.path.join(self.directory, TABLE_FILE), ordered)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Runs a grid or list of experiment configurations.')
+    parser.add_argument('spec', help='JSON sweep spec: {"base": {...}, "grid": {"param": [...]}, "runs": [...]}')
+    parser.add_argument('--output', default=os.path.join('checkpoints', 'sweep'),
+                        help='directory of run checkpoints and of %s' % TABLE_FILE)
+    parser.add_argument('--processes', type=int, help='concurrent runs (default: CPU count)')
+    parser.add_argument('--memory', type=int, help='address space limit of every run in MiB')
+    parser.add_argument('--nice', type=int, default=0, help='niceness added to worker processes')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    with open(options.spec) as f:
+        spec = json.load(f)
+    rows = Sweep(spec, options.output, options.processes, options.memory, options.nice).run()
+    return 1 if any('error' in row for row in rows) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
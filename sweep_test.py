@@ -0,0 +1,74 @@
+import io
+import os
+import csv
+import tempfile
+from unittest import TestCase, mock
+
+import sweep
+
+
+SMALL = {'sheep': 4, 'wolves': 2, 'epochs': 1, 'steps': 2}
+
+# a worker ended without raising, as by the OOM killer
+def killed(config, directory):
+    os._exit(1)
+
+class ExpandTest(TestCase):
+    def test_grid(self):
+        configs = sweep.expand({'base': SMALL, 'grid': {'seed': [1, 2], 'sheep_mode': ['darwinian', 'lamarckian']}})
+        self.assertEqual([(c['seed'], c['sheep_mode']) for c in configs],
+                         [(1, 'darwinian'), (1, 'lamarckian'), (2, 'darwinian'), (2, 'lamarckian')])
+        self.assertTrue(all(c['sheep'] == 4 and c['mutpb'] == sweep.DEFAULTS['mutpb'] for c in configs))
+
+    def test_list(self):
+        configs = sweep.expand([{'steps': 10}, {'cxpb': 0}])
+        self.assertEqual([(c['steps'], c['cxpb']) for c in configs], [(10, .5), (500, 0)])
+        self.assertEqual(sweep.expand({}), [sweep.DEFAULTS])
+
+    def test_unknown_parameters(self):
+        with self.assertRaises(ValueError):
+            sweep.expand({'grid': {'sheeps': [1]}})
+        with self.assertRaises(ValueError):
+            sweep.expand({'grids': {}})
+
+    def test_unknown_modes(self):
+        with self.assertRaisesRegex(ValueError, 'sheep_mode'):
+            sweep.expand({'runs': [{'sheep_mode': 'unknown'}]})
+
+    def test_run_name_depends_on_config_only(self):
+        config = sweep.expand({'base': SMALL})[0]
+        self.assertEqual(sweep.run_name(config), sweep.run_name(dict(reversed(list(config.items())))))
+        self.assertNotEqual(sweep.run_name(config), sweep.run_name(dict(config, seed=1)))
+
+class SweepTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sweep(self, spec):
+        out = io.StringIO()
+        return sweep.Sweep(spec, self.tmp.name, processes=2, out=out).run(), out.getvalue()
+
+    def test_runs_and_skips_completed(self):
+        spec = {'base': SMALL, 'grid': {'seed': [1, 2]}, 'runs': [{'sheep': 0}]}
+        rows, _ = self.sweep(spec)
+
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all('sheep.max' in row for row in rows[:2]))
+        self.assertIn('error', rows[2])
+        for row in rows[:2]:
+            self.assertTrue(os.path.exists(os.path.join(self.tmp.name, row['run'], sweep.DONE_FILE)))
+        with open(os.path.join(self.tmp.name, sweep.TABLE_FILE)) as f:
+            self.assertEqual([row['run'] for row in csv.DictReader(f)], [row['run'] for row in rows])
+
+        rows_again, out = self.sweep(spec)
+        self.assertIn('3 runs, 2 done, 1 to run', out)
+        self.assertEqual(rows_again[:2], rows[:2])
+
+    def test_killed_worker_fails_its_run(self):
+        with mock.patch('sweep.execute', killed):
+            rows, out = self.sweep({'base': SMALL})
+        self.assertIn('error', rows[0])
+        self.assertIn('failed', out)